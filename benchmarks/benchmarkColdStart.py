@@ -0,0 +1,43 @@
+'''
+Measure the cold-start cost of the package: a fresh interpreter importing it, importing the converter module a
+batch worker runs, importing the converter's dependencies as a worker's pool initializer does, and running the CLI.
+
+usage:  python benchmarks/benchmarkColdStart.py [n_repeats]
+
+Each case runs in a new python process; the best of n_repeats wall times is reported, next to a bare interpreter
+start for reference. python -X importtime -c "import nwbpatchclamp" shows where the time of a case goes.
+'''
+
+import os
+import subprocess
+import sys
+import time
+
+repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+cases = [
+    ('python (no imports)', ['-c', 'pass']),
+    ('import nwbpatchclamp', ['-c', 'import nwbpatchclamp']),
+    ('import writeNWBpatchClamp', ['-c', 'from nwbpatchclamp import writeNWBpatchClamp']),
+    ('worker start (+pyabf, pynwb, pandas, h5py)', ['-c', 'from nwbpatchclamp.batch import '
+                                                          '_startWorker; _startWorker()']),
+    ('nwbpatchclamp --help', ['-m', 'nwbpatchclamp', '--help']),
+]
+
+
+def coldStart(args, n_repeats=5):
+
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([repo, os.environ.get('PYTHONPATH', '')]))
+    times = []
+    for _ in range(n_repeats):
+        t0 = time.perf_counter()
+        subprocess.check_call([sys.executable] + args, env=env, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+if __name__ == '__main__':
+    n_repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+
+    for name, args in cases:
+        print('%-45s %7.1f ms' % (name, coldStart(args, n_repeats) * 1e3))
@@ -0,0 +1,57 @@
+'''
+Compare NWB files written with raw int16 samples (writeNWBpatchClamp(raw=True)) against float64 samples:
+file size, full read, single-sweep read and time-window read throughput through NWBpatchClampReader.
+
+usage:  python benchmarks/benchmarkInt16Storage.py [path/to/file.abf] [n_repeats]
+
+If no .abf file is given, a synthetic white-noise recording (syntheticPatchClamp) is written to a temporary directory.
+'''
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from nwbpatchclamp import writeNWBpatchClamp, NWBpatchClampReader, writeSyntheticABF
+from utilsBenchmark import bestOf
+
+
+def main(fpath=None, n_repeats=5):
+
+    tmpdir = tempfile.mkdtemp()
+    if fpath is None:
+        fpath = os.path.join(tmpdir, 'synthetic.abf')
+        writeSyntheticABF(fpath, n_sweeps=100, sweep_duration=1.0, rate=10e4)
+
+    results = {}
+    for mode, options in (('float64', {'dtype': np.float64}), ('int16', {'raw': True})):
+        out = os.path.join(tmpdir, mode) + os.sep
+        os.makedirs(out)
+        writeNWBpatchClamp(file_path=fpath, output_path=out, date='Jan 01, 2018', cell_number='1', cell_id='bench',
+                           offset='0', excel_location=None, **options)
+        nwb_path = out + 'bench.nwb'
+
+        # cold reads: the file is opened again for every repeat
+        reader = lambda: NWBpatchClampReader(nwb_path)
+        with reader() as nwb:
+            values = nwb.current_clamp[()]
+        results[mode] = {'file_MB': os.path.getsize(nwb_path) / 1e6,
+                         'full_s': bestOf(lambda nwb: nwb.current_clamp[()], n_repeats, reader),
+                         'sweep_s': bestOf(lambda nwb: nwb.current_clamp[len(values) // 2], n_repeats, reader),
+                         'window_s': bestOf(lambda nwb: nwb.current_clamp.window(0.2, 0.3), n_repeats, reader),
+                         'values': values}
+
+    assert np.array_equal(results['float64']['values'], results['int16']['values'])
+
+    print('%-8s %10s %14s %14s %14s' % ('mode', 'size (MB)', 'full read', 'one sweep', '0.1 s window'))
+    for mode, r in results.items():
+        mb = r['values'].size * 8 / 1e6  # physical values delivered, as float64
+        print('%-8s %10.1f %9.1f MB/s %11.2f ms %11.2f ms'
+              % (mode, r['file_MB'], mb / r['full_s'], r['sweep_s'] * 1e3, r['window_s'] * 1e3))
+    print('int16 file is %.1fx smaller' % (results['float64']['file_MB'] / results['int16']['file_MB']))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else None, int(sys.argv[2]) if len(sys.argv) > 2 else 5)
@@ -0,0 +1,61 @@
+'''
+Benchmark the single-pass sweep loader (loadABFpatchClamp) against the original per-sweep setSweep() loops.
+
+usage:  python benchmarks/benchmarkLoadABF.py [path/to/file.abf] [n_repeats]
+
+If no .abf file is given, a synthetic white-noise recording (syntheticPatchClamp) is written to a temporary directory.
+'''
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pyabf
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from nwbpatchclamp import loadABFpatchClamp, writeSyntheticABF
+from utilsBenchmark import bestOf
+
+
+def loadSweepsLoop(fpath):
+
+    # reference implementation: the loops writeNWBpatchClamp used before loadABFpatchClamp
+    a = pyabf.ABF(fpath)
+    V = np.empty((a.sweepCount, a.sweepPointCount), float)
+    for i in range(0, a.sweepCount):
+        a.setSweep(i)
+        V[i] = a.sweepY
+
+    I = np.empty((a.sweepCount, a.sweepPointCount), float)
+    for i in range(0, a.sweepCount):
+        a.setSweep(i)
+        I[i] = a.sweepC
+
+    return V, I
+
+
+def main(fpath=None, n_repeats=5):
+
+    if fpath is None:
+        tmpdir = tempfile.mkdtemp()
+        fpath = os.path.join(tmpdir, 'synthetic.abf')
+        writeSyntheticABF(fpath, n_sweeps=300, sweep_duration=0.2, rate=10e4)
+
+    a = pyabf.ABF(fpath)
+    print('%s: %d sweeps x %d points' % (os.path.basename(fpath), a.sweepCount, a.sweepPointCount))
+
+    V_loop, I_loop = loadSweepsLoop(fpath)
+    for dtype in (np.float64, np.float32):
+        V, I, _ = loadABFpatchClamp(fpath, dtype=dtype)
+        assert np.array_equal(V, V_loop.astype(dtype)) and np.array_equal(I, I_loop.astype(dtype), equal_nan=True)
+
+    t_loop = bestOf(lambda: loadSweepsLoop(fpath), n_repeats)
+    print('setSweep loops:              %8.3f s' % t_loop)
+    for dtype in (np.float64, np.float32):
+        t_vec = bestOf(lambda: loadABFpatchClamp(fpath, dtype=dtype), n_repeats)
+        print('loadABFpatchClamp (%-7s):  %8.3f s   speedup %5.1fx' % (np.dtype(dtype).name, t_vec, t_loop / t_vec))
+
+
+if __name__ == '__main__':
+    main(sys.argv[1] if len(sys.argv) > 1 else None, int(sys.argv[2]) if len(sys.argv) > 2 else 5)
@@ -0,0 +1,169 @@
+'''
+End-to-end benchmark of writeNWBpatchClamp and NWBpatchClampReader on synthetic white-noise recordings.
+
+For every recording size and conversion mode it measures conversion wall time, peak memory of the converting
+process, NWB file size, and cold read latency (the file opened again for every repeat) for a full read, a single sweep, a 0.1 s time window and a 1500 pixel
+envelope of a whole sweep (NWBEnvelope). Results are appended as JSON lines (one record per size x mode), tagged
+with the git revision, so runs of different versions can be compared:
+
+usage:  python benchmarks/benchmarkSuite.py --sweeps 20 100 --duration 2 --out results.jsonl
+        python benchmarks/benchmarkSuite.py --sweeps 20 100 --duration 2 --out new.jsonl --compare results.jsonl
+'''
+
+import argparse
+import json
+import multiprocessing
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from utilsBenchmark import bestOf
+
+repo = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, repo)
+
+# writeNWBpatchClamp options benchmarked for every recording size
+modes = {
+    'default': {},
+    'stream': {'stream': True},
+    'raw': {'raw': True},
+    'archive': {'storage': 'archive'},
+    'pyramid': {'pyramid': True},
+}
+
+
+def _convert(abf_path, output_path, options, queue):
+
+    # runs in a fresh process, so ru_maxrss is the peak memory of this conversion alone
+    sys.path.insert(0, repo)
+    from nwbpatchclamp import writeNWBpatchClamp
+
+    t0 = time.perf_counter()
+    writeNWBpatchClamp(file_path=abf_path, output_path=output_path, date='Jan 01, 2018', cell_number='1',
+                       cell_id='bench', species='Synthetic', offset='0', excel_location=None, **options)
+    seconds = time.perf_counter() - t0
+
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put({'convert_s': seconds, 'peak_rss_MB': maxrss / (1e6 if sys.platform == 'darwin' else 1e3)})
+
+
+def gitRevision():
+
+    try:
+        return subprocess.check_output(['git', 'describe', '--always', '--dirty'], cwd=repo,
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def runSuite(sweep_counts=(20,), duration=2.0, rate=10e4, n_repeats=3, selected_modes=None, out=None):
+
+    '''
+    :param sweep_counts:    recording sizes to benchmark (number of sweeps)
+    :param duration:        sweep length (s)
+    :param rate:            sampling rate (Hz)
+    :param n_repeats:       repeats of each read measurement, each on a newly opened file (best is kept)
+    :param selected_modes:  names from modes to run (default: all)
+    :param out:             JSON lines file to append the records to (None to only return them)
+
+    :return: list of records
+    '''
+
+    from nwbpatchclamp import writeSyntheticABF, NWBpatchClampReader
+    from nwbpatchclamp.pyramid import NWBEnvelope
+
+    ctx = multiprocessing.get_context('spawn')
+    revision = gitRevision()
+    records = []
+
+    for n_sweeps in sweep_counts:
+        tmpdir = tempfile.mkdtemp()
+        abf_path = os.path.join(tmpdir, 'synthetic.abf')
+        writeSyntheticABF(abf_path, n_sweeps=n_sweeps, sweep_duration=duration, rate=rate)
+
+        for mode in (selected_modes or modes):
+            output_path = os.path.join(tmpdir, mode) + os.sep
+            os.makedirs(output_path)
+
+            queue = ctx.Queue()
+            proc = ctx.Process(target=_convert, args=(abf_path, output_path, modes[mode], queue))
+            proc.start()
+            proc.join()
+            if proc.exitcode != 0:
+                print('%s, %d sweeps: conversion failed (exit code %s)' % (mode, n_sweeps, proc.exitcode))
+                continue
+            record = queue.get()
+
+            nwb_path = output_path + 'bench.nwb'
+            # cold reads: the file is opened again for every repeat, so none is served from the HDF5 chunk cache
+            reader = lambda: NWBpatchClampReader(nwb_path)
+            record.update({'read_full_s': bestOf(lambda nwb: nwb.current_clamp[()], n_repeats, reader),
+                           'read_sweep_s': bestOf(lambda nwb: nwb.current_clamp[n_sweeps // 2], n_repeats, reader),
+                           'read_window_s': bestOf(lambda nwb: nwb.current_clamp.window(duration / 2,
+                                                                                        duration / 2 + 0.1),
+                                                   n_repeats, reader)})
+
+            # zoomed-out view of a whole sweep at 1500 pixels (read from the series itself without a pyramid)
+            record['read_envelope_s'] = bestOf(lambda env: env.window(sweep=n_sweeps // 2, pixels=1500), n_repeats,
+                                               lambda: NWBEnvelope(nwb_path))
+
+            record.update({'revision': revision, 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'mode': mode,
+                           'n_sweeps': n_sweeps, 'n_points': int(round(duration * rate)), 'rate': rate,
+                           'abf_bytes': os.path.getsize(abf_path), 'nwb_bytes': os.path.getsize(nwb_path)})
+            records.append(record)
+            print('%-8s %5d sweeps: convert %7.2f s, peak %7.1f MB, file %7.1f MB, read full %7.1f ms, '
+                  'sweep %6.2f ms, window %6.2f ms, envelope %6.2f ms'
+                  % (mode, n_sweeps, record['convert_s'], record['peak_rss_MB'], record['nwb_bytes'] / 1e6,
+                     record['read_full_s'] * 1e3, record['read_sweep_s'] * 1e3, record['read_window_s'] * 1e3,
+                     record['read_envelope_s'] * 1e3))
+
+            if out is not None:
+                with open(out, 'a') as f:
+                    f.write(json.dumps(record) + '\n')
+
+    return records
+
+
+def compare(records, baseline_path):
+
+    '''
+    Print each measurement of records as a ratio to the matching (mode, n_sweeps, n_points) record of a previous
+    run; below 1 is faster/smaller than the baseline.
+    '''
+
+    with open(baseline_path) as f:
+        baseline = {}
+        for line in f:
+            r = json.loads(line)
+            baseline[(r['mode'], r['n_sweeps'], r['n_points'])] = r  # the latest record of each case wins
+
+    metrics = ['convert_s', 'peak_rss_MB', 'nwb_bytes', 'read_full_s', 'read_sweep_s', 'read_window_s',
+               'read_envelope_s']
+    print('')
+    print('ratio to %s' % baseline_path)
+    print('%-8s %7s ' % ('mode', 'sweeps') + ' '.join('%13s' % m for m in metrics))
+    for r in records:
+        b = baseline.get((r['mode'], r['n_sweeps'], r['n_points']))
+        if b is None:
+            continue
+        print('%-8s %7d ' % (r['mode'], r['n_sweeps']) +
+              ' '.join('%13.2f' % (r[m] / b[m]) if b.get(m) else '%13s' % '-' for m in metrics))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark NWB conversion and reading on synthetic recordings.')
+    parser.add_argument('--sweeps', type=int, nargs='+', default=[20], help='sweep counts to benchmark')
+    parser.add_argument('--duration', type=float, default=2.0, help='sweep length (s)')
+    parser.add_argument('--rate', type=float, default=10e4, help='sampling rate (Hz)')
+    parser.add_argument('--repeats', type=int, default=3, help='repeats of each read measurement')
+    parser.add_argument('--modes', nargs='+', choices=sorted(modes), default=None, help='conversion modes to run')
+    parser.add_argument('--out', default=None, help='JSON lines file to append results to')
+    parser.add_argument('--compare', default=None, help='JSON lines results of a previous run to compare against')
+    args = parser.parse_args()
+
+    results = runSuite(args.sweeps, args.duration, args.rate, args.repeats, args.modes, args.out)
+    if args.compare:
+        compare(results, args.compare)
@@ -0,0 +1,34 @@
+'''
+Timing helper shared by the benchmark scripts (imported from this directory, which python puts first on sys.path
+when a script of it is run).
+'''
+
+import time
+
+
+def bestOf(func, n_repeats, reopen=None):
+
+    '''
+    Best wall time of n_repeats calls of func.
+
+    :param func:            function to time; called with the object reopen returns, if given
+    :param n_repeats:       number of calls
+    :param reopen:          function returning a context manager (e.g. lambda: NWBpatchClampReader(nwb_path)),
+                            entered outside the timing before every call: each call then reads through a newly
+                            opened file with an empty HDF5 chunk cache, not from the chunks the previous call cached
+
+    :return: seconds
+    '''
+
+    times = []
+    for _ in range(n_repeats):
+        if reopen is None:
+            t0 = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - t0)
+        else:
+            with reopen() as handle:
+                t0 = time.perf_counter()
+                func(handle)
+                times.append(time.perf_counter() - t0)
+    return min(times)
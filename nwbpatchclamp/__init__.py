@@ -0,0 +1,48 @@
+'''
+Conversion of patch-clamp recordings (.abf) to NWB, and reading, indexing and feature extraction of the NWB files.
+
+Submodules are imported on first access of one of the names below, and pyabf, pynwb, pandas and h5py only when a
+function needs them, so ``import nwbpatchclamp`` is cheap and has no side effects (safe in worker processes).
+
+Submodules are named after what they implement (load, write, read, index, ledger, ...), never after a function
+they define: importing a submodule binds it on the package, where it would replace that function.
+'''
+
+import importlib
+
+__version__ = '0.1.0'
+
+# public name -> submodule it lives in
+_exports = {
+    'loadABFpatchClamp': 'load', 'loadABFraw': 'load', 'abfScaling': 'load', 'iterABFsweeps': 'load',
+    'writeNWBpatchClamp': 'write', 'updateTrackingCSV': 'write',
+    'readNWBpatchClamp': 'read', 'NWBpatchClampReader': 'read', 'SweepArray': 'read',
+    'batchNWBpatchClamp': 'batch', 'readManifest': 'batch',
+    'pipelineNWBpatchClamp': 'pipeline',
+    'indexNWBpatchClamp': 'index', 'queryIndex': 'index',
+    'NWBCohort': 'cohort',
+    'minMaxPyramid': 'pyramid', 'NWBEnvelope': 'pyramid',
+    'storage_profiles': 'storage', 'storageReport': 'storage',
+    'exportTrackingCSV': 'ledger',
+    'SpikeFeatures': 'features', 'sweepFeatures': 'features',
+    'syntheticPatchClamp': 'synthetic', 'writeSyntheticABF': 'synthetic',
+    'Instrumentation': 'instrument',
+    'sweepChunks': 'utils', 'scaledData': 'utils', 'readText': 'utils',
+    'seriesName': 'utils', 'seriesPath': 'utils', 'timeToIndex': 'utils',
+}
+
+__all__ = sorted(_exports)
+
+
+def __getattr__(name):
+
+    if name in _exports:
+        value = getattr(importlib.import_module('.' + _exports[name], __name__), name)
+        globals()[name] = value  # later lookups skip __getattr__
+        return value
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+
+def __dir__():
+
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,157 @@
+import csv
+import inspect
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .write import writeNWBpatchClamp, updateTrackingCSV, excel_location
+
+# manifest columns that are passed to writeNWBpatchClamp; any other column (e.g. 'note') is kept for reference only
+convert_params = [p for p in inspect.signature(writeNWBpatchClamp).parameters
+                  if p not in ('excel_location', 'ledger', 'instrument')]
+
+# time this worker process spent importing the conversion dependencies (set by _startWorker)
+_import_seconds = 0.0
+
+
+def _startWorker():
+
+    # pool initializer: pay the heavy imports once per worker, before the first job, and time them
+    global _import_seconds
+    t0 = time.perf_counter()
+    import pyabf, pynwb, pandas, h5py  # noqa: F401
+    _import_seconds = time.perf_counter() - t0
+
+
+def readManifest(manifest_path):
+
+    '''
+    Read a conversion manifest, one recording per row/entry.
+
+    CSV manifests have a header row with writeNWBpatchClamp argument names (file_path, output_path, cell_id, date,
+    cell_number, cell_type, species, experiment_condition, gain, dc, offset, ...). YAML manifests are a list of
+    mappings with the same keys (requires PyYAML).
+
+    :param manifest_path:   path to a .csv or .yaml/.yml manifest
+
+    :return: list of dicts of writeNWBpatchClamp keyword arguments
+    '''
+
+    if manifest_path.lower().endswith(('.yaml', '.yml')):
+        import yaml
+        with open(manifest_path) as f:
+            entries = yaml.safe_load(f) or []
+    else:
+        with open(manifest_path, newline='') as f:
+            entries = list(csv.DictReader(f))
+
+    jobs = []
+    for entry in entries:
+        job = {k: v for k, v in entry.items() if k in convert_params and v not in (None, '')}
+        for k in ('cell_id', 'cell_number', 'date', 'dc', 'offset', 'recording'):  # YAML may parse these as numbers or dates
+            if k in job:
+                job[k] = str(job[k])
+        for k in ('gain', 'spike_threshold'):
+            if k in job:
+                job[k] = float(job[k])
+        for k in ('stream', 'append', 'pyramid', 'raw', 'features'):
+            if k in job:
+                job[k] = str(job[k]).lower() in ('1', 'true', 'yes')
+        if 'chunk_sweeps' in job:
+            job['chunk_sweeps'] = int(job['chunk_sweeps'])
+        jobs.append(job)
+
+    return jobs
+
+
+def _convert(job):
+
+    # runs in a worker process; errors are returned instead of raised so one bad file does not stop the batch
+    t0 = time.time()
+    try:
+        row = writeNWBpatchClamp(excel_location=None, **job)
+        error = None
+    except Exception:
+        row = None
+        error = traceback.format_exc()
+
+    return {'cell_id': job.get('cell_id'), 'file_path': job.get('file_path'), 'row': row, 'error': error,
+            'seconds': time.time() - t0, 'worker': os.getpid(), 'import_seconds': _import_seconds,
+            'bytes': os.path.getsize(job['file_path']) if os.path.exists(job.get('file_path', '')) else 0}
+
+
+def _convertInOrder(jobs):
+
+    # recordings appended to the same cell file must not be written concurrently: they run one after another
+    return [_convert(job) for job in jobs]
+
+
+def batchNWBpatchClamp(manifest_path, workers=None, excel_location=excel_location, ledger=None, **options):
+
+    '''
+    Convert every recording listed in a manifest to NWB on a pool of worker processes.
+
+    Each file is converted independently: a file that fails (missing, corrupt .abf, ...) is reported in the summary
+    and does not stop the others. Entries with append=True that share a cell file (output_path and cell_id) are
+    converted in manifest order by a single worker. The tracking .csv file is updated once, from this process, after all conversions
+    (or, with a ledger, not at all: the workers record their conversions in the ledger).
+
+    :param manifest_path:   .csv or .yaml manifest (see readManifest)
+    :param workers:         number of worker processes (default: number of CPUs)
+    :param excel_location:  tracking .csv file to append the converted cells to (None to skip the update); not
+                            updated when a ledger is given, exportTrackingCSV writes it from the ledger instead
+    :param ledger:          SQLite conversion ledger shared by the workers; unchanged recordings are skipped
+    :param options:         writeNWBpatchClamp arguments applied to every entry unless the manifest sets them
+                            (e.g. stream=True, storage='archive')
+
+    :return: results        list of per-file result dicts (cell_id, file_path, row, error, seconds, bytes, worker,
+                            import_seconds); row is None for recordings skipped by the ledger
+    '''
+
+    jobs = [dict(options, ledger=ledger, **job) for job in readManifest(manifest_path)]
+    print('Converting %d recordings from %s ...' % (len(jobs), manifest_path))
+
+    groups = {}
+    for i, job in enumerate(jobs):
+        target = (job.get('output_path', ''), job.get('cell_id', '')) if job.get('append') else i
+        groups.setdefault(target, []).append(job)
+
+    results = []
+    t0 = time.time()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_startWorker) as pool:
+        futures = [pool.submit(_convertInOrder, group) for group in groups.values()]
+        for future in as_completed(futures):
+            for result in future.result():
+                results.append(result)
+                status = 'FAILED' if result['error'] else 'skipped' if result['row'] is None else 'ok'
+                print('[%d/%d] %s %s (%.1f s)' % (len(results), len(jobs), result['cell_id'], status,
+                                                  result['seconds']))
+    elapsed = time.time() - t0
+
+    converted = [r for r in results if r['error'] is None and r['row'] is not None]
+    skipped = [r for r in results if r['error'] is None and r['row'] is None]
+    failed = [r for r in results if r['error'] is not None]
+
+    if excel_location is not None and ledger is None and converted:
+        updateTrackingCSV(excel_location, [r['row'] for r in converted])
+
+    # ----------------------------------------------------------------------------------------------------------------------
+    # Summary
+    # ----------------------------------------------------------------------------------------------------------------------
+
+    mb = sum(r['bytes'] for r in converted) / 1e6
+    print('')
+    print('%d converted, %d skipped, %d failed in %.1f s (%.2f files/s, %.1f MB/s of .abf input)'
+          % (len(converted), len(skipped), len(failed), elapsed, len(converted) / elapsed if elapsed else 0.,
+             mb / elapsed if elapsed else 0.))
+    startup = {r['worker']: r['import_seconds'] for r in results}
+    if startup:
+        print('%d worker processes, dependency import %.2f s mean / %.2f s max per worker'
+              % (len(startup), sum(startup.values()) / len(startup), max(startup.values())))
+    for r in failed:
+        print('FAILED %s (%s):' % (r['cell_id'], r['file_path']))
+        print('    ' + r['error'].strip().splitlines()[-1])
+
+    return results
+
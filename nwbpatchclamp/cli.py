@@ -0,0 +1,129 @@
+'''
+Command line interface, installed as the ``nwbpatchclamp`` console script (or run with python -m nwbpatchclamp):
+
+usage:  nwbpatchclamp convert manifest.csv --workers 8 --ledger ledger.sqlite
+        nwbpatchclamp convert manifest.csv --pipeline --depth 2 --scratch /tmp/nwb
+        nwbpatchclamp read cell.nwb --sweeps 0 3 --window 0.5 1.5 --out v.npy
+        nwbpatchclamp index /data/nwb --index nwb_index.sqlite
+        nwbpatchclamp export-ledger ledger.sqlite cells.csv
+
+Every subcommand imports its module (and that module its dependencies) only when it runs, so --help is fast.
+'''
+
+import argparse
+
+
+def convert(args):
+
+    options = {'excel_location': None if args.no_excel else args.excel_location, 'ledger': args.ledger,
+               'stream': args.stream, 'storage': args.storage, 'append': args.append, 'pyramid': args.pyramid,
+               'instrument': args.instrument_log}
+
+    if args.pipeline:
+        from .pipeline import pipelineNWBpatchClamp
+        pipelineNWBpatchClamp(args.manifest, depth=args.depth, scratch_dir=args.scratch, **options)
+    else:
+        from .batch import batchNWBpatchClamp
+        batchNWBpatchClamp(args.manifest, workers=args.workers, **options)
+
+
+def read(args):
+
+    import numpy as np
+    from .read import NWBpatchClampReader
+
+    with NWBpatchClampReader(args.nwb_file, instrument=args.instrument_log, recording=args.recording) as nwb:
+        if len(nwb.recordings) > 1:
+            print('recordings: %s' % ', '.join('(first)' if r is None else r for r in nwb.recordings))
+        for name, series in (('current_stimulus', nwb.current_stimulus), ('current_clamp', nwb.current_clamp)):
+            print('%-17s %d sweeps x %d points, %s, %g Hz, %s' % (name, series.shape[0], series.shape[1],
+                                                                  series.dtype, series.rate, series.series.unit))
+        if args.out is None:
+            return
+
+        sweeps = slice(None) if args.sweeps is None else slice(args.sweeps[0], args.sweeps[1])
+        start, stop = args.window if args.window is not None else (None, None)
+        V = nwb.current_clamp.window(start, stop, sweeps=sweeps)
+        np.save(args.out, V)
+        print('%s of current_clamp written to %s' % ('x'.join(str(n) for n in V.shape), args.out))
+
+
+def index(args):
+
+    from .index import indexNWBpatchClamp
+
+    indexNWBpatchClamp(args.nwb_dir, args.index)
+
+
+def exportLedger(args):
+
+    from .ledger import exportTrackingCSV
+
+    print('%d cells written to %s' % (exportTrackingCSV(args.ledger, args.csv), args.csv))
+
+
+def buildParser():
+
+    # the default tracking .csv location lives in write, which is not imported just to build --help
+    excel_location = '/Volumes/PrajayShah_1TB/Work/White noise/ResponseVariabilityCells.csv'
+
+    parser = argparse.ArgumentParser(prog='nwbpatchclamp', description='Patch-clamp .abf to NWB conversion tools.')
+    parser.add_argument('--version', action='store_true', help='print the package version and exit')
+    sub = parser.add_subparsers(dest='command')
+
+    p = sub.add_parser('convert', help='convert the .abf recordings listed in a manifest to NWB files')
+    p.add_argument('manifest', help='.csv or .yaml manifest of recordings to convert')
+    p.add_argument('--workers', type=int, default=None, help='number of worker processes (default: all CPUs)')
+    p.add_argument('--pipeline', action='store_true',
+                   help='convert in one process, overlapping .abf reads, conversion and NWB writes (slow volumes)')
+    p.add_argument('--depth', type=int, default=2, help='recordings queued between pipeline stages')
+    p.add_argument('--scratch', default=None, help='local scratch directory for the pipeline (default: a temp dir)')
+    p.add_argument('--excel-location', default=excel_location,
+                   help='tracking .csv file to update (not with --ledger: see export-ledger)')
+    p.add_argument('--no-excel', action='store_true', help='do not update the tracking .csv file')
+    p.add_argument('--ledger', default=None, help='SQLite conversion ledger (skips unchanged recordings)')
+    p.add_argument('--stream', action='store_true', help='stream sweeps to the NWB file (bounded memory)')
+    p.add_argument('--storage', default=None, help='HDF5 storage profile (analysis, archive, window)')
+    p.add_argument('--pyramid', action='store_true', help='store min/max envelope pyramids for trace display')
+    p.add_argument('--append', action='store_true',
+                   help='add recordings of a cell to its existing NWB file instead of overwriting it')
+    p.add_argument('--instrument-log', default=None, help='JSON lines file for per-stage timing/memory records')
+    p.set_defaults(func=convert)
+
+    p = sub.add_parser('read', help='summarize an NWB file and optionally save sweeps of current_clamp')
+    p.add_argument('nwb_file', help='NWB file written by writeNWBpatchClamp')
+    p.add_argument('--sweeps', type=int, nargs=2, default=None, metavar=('FIRST', 'STOP'),
+                   help='sweep range to save (default: all)')
+    p.add_argument('--window', type=float, nargs=2, default=None, metavar=('START', 'STOP'),
+                   help='time window to save, in seconds (default: whole sweep)')
+    p.add_argument('--recording', default=None, help='appended recording to read (default: the first one)')
+    p.add_argument('--out', default=None, help='.npy file to save the selected current_clamp data to')
+    p.add_argument('--instrument-log', default=None, help='JSON lines file for per-stage timing/memory records')
+    p.set_defaults(func=read)
+
+    p = sub.add_parser('index', help='index the metadata and sweep statistics of a directory of NWB files')
+    p.add_argument('nwb_dir', help='directory of NWB files (searched recursively)')
+    p.add_argument('--index', default=None, help='SQLite index file (default: <nwb_dir>/nwb_index.sqlite)')
+    p.set_defaults(func=index)
+
+    p = sub.add_parser('export-ledger', help='export the conversion ledger to the tracking .csv format')
+    p.add_argument('ledger', help='SQLite conversion ledger')
+    p.add_argument('csv', help='tracking .csv file to write')
+    p.set_defaults(func=exportLedger)
+
+    return parser
+
+
+def main(argv=None):
+
+    parser = buildParser()
+    args = parser.parse_args(argv)
+
+    if args.version:
+        from . import __version__
+        print(__version__)
+    elif args.command is None:
+        parser.print_help()
+    else:
+        args.func(args)
+
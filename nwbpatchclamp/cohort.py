@@ -0,0 +1,355 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from .features import spikeCrossings
+from .utils import scaledData, readText, seriesPath, timeToIndex
+
+
+class NWBCohort(object):
+
+    '''
+    Lazy, labelled (cell_id x sweep x time) view of the ccs or ccss series of many NWB files written by
+    writeNWBpatchClamp, with reductions computed chunk by chunk on a pool of worker processes.
+
+        cohort = NWBCohort.fromIndex(index_path, "cell_type=? AND dc=?", ('Hu L5', '100'))
+        v = cohort.sel(sweeps=slice(0, 10), start=0.5, stop=1.5)   # nothing is read yet
+        trace = v.mean(dim='sweep', pooled=True)                     # population mean response (points,)
+        sd = np.sqrt(v.var(dim='sweep'))                             # {cell_id: (points,)}
+        lags, sta, n_spikes = cohort.sta(window=(-0.1, 0.0))         # spike-triggered average of ccss
+
+    Only the file metadata is read on construction; each chunk (chunk_sweeps sweeps x the selected points of one
+    cell) is read by a worker, reduced to partial sums and dropped, so memory is bounded by workers x chunk size
+    regardless of the number or length of the recordings. Partial means and variances are merged pairwise
+    (Chan et al.), so results match a single pass over the whole data.
+
+    Cells are labelled with the NWB identifier (the cell_id given to writeNWBpatchClamp); a file whose identifier
+    is already in the cohort is labelled <identifier>:<file name>.
+
+    :param nwb_paths:       NWB files, or a directory searched recursively for .nwb files
+    :param series:          'ccs' (membrane potential) or 'ccss' (injected current)
+    :param recording:       recording appended to the cell files (writeNWBpatchClamp(append=True)); None for the
+                            ccs/ccss series the files were created with
+    :param chunk_sweeps:    number of sweeps read and reduced at a time
+    :param workers:         number of worker processes (default: number of CPUs; 1 to compute in this process)
+    '''
+
+    def __init__(self, nwb_paths, series='ccs', recording=None, chunk_sweeps=32, workers=None):
+
+        import h5py
+
+        if isinstance(nwb_paths, str) and os.path.isdir(nwb_paths):
+            nwb_paths = sorted(os.path.join(root, name) for root, dirs, files in os.walk(nwb_paths)
+                               for name in files if name.endswith('.nwb'))
+
+        self.series = series
+        self.recording = recording
+        self.chunk_sweeps = chunk_sweeps
+        self.workers = workers
+        self.sweeps = slice(None)
+        self.start = None
+        self.stop = None
+
+        self.cells = {}
+        for path in nwb_paths:
+            with h5py.File(path, 'r') as h5:
+                group = h5[seriesPath(series, recording)]
+                starting_time = group['starting_time']
+                cell_id = readText(h5, 'identifier') or os.path.splitext(os.path.basename(path))[0]
+                if cell_id in self.cells:
+                    cell_id = '%s:%s' % (cell_id, os.path.basename(path))
+                self.cells[cell_id] = {'path': os.path.abspath(path),
+                                       'shape': tuple(int(n) for n in group['data'].shape),
+                                       'rate': float(starting_time.attrs['rate']),
+                                       'starting_time': float(starting_time[()])}
+
+    @classmethod
+    def fromIndex(cls, index_path, where='1', params=(), **kwargs):
+
+        '''
+        Cohort of the files of an indexNWBpatchClamp index that match an SQL condition on its files table.
+
+        :param index_path:      SQLite index written by indexNWBpatchClamp
+        :param where:           SQL condition, e.g. "cell_type=? AND gain=?"
+        :param params:          values of the ? placeholders in where
+        :param kwargs:          NWBCohort arguments (series, recording, chunk_sweeps, workers)
+        '''
+
+        from .index import queryIndex
+
+        paths = queryIndex(index_path, 'SELECT path FROM files WHERE %s ORDER BY path' % where, params)['path']
+        return cls(list(paths), **kwargs)
+
+    def sel(self, cell_id=None, sweeps=None, start=None, stop=None):
+
+        '''
+        Select cells, sweeps and a time window, without reading anything.
+
+        :param cell_id:         cell label or list of labels to keep (default: all)
+        :param sweeps:          slice of sweeps (positive step) applied to every cell (default: all)
+        :param start:           window start in seconds from sweep start (default: start of the sweep)
+        :param stop:            window end in seconds, exclusive (default: end of the sweep)
+
+        :return: new NWBCohort
+        '''
+
+        other = object.__new__(NWBCohort)
+        other.__dict__.update(self.__dict__)
+        if cell_id is not None:
+            keep = [cell_id] if isinstance(cell_id, str) else list(cell_id)
+            other.cells = {c: self.cells[c] for c in keep}
+        if sweeps is not None:
+            if not isinstance(sweeps, slice) or (sweeps.step or 1) < 1:
+                raise ValueError('sweeps must be a slice with a positive step')
+            other.sweeps = sweeps
+        if start is not None:
+            other.start = start
+        if stop is not None:
+            other.stop = stop
+        return other
+
+    @property
+    def shapes(self):
+
+        '''
+        :return: {cell_id: (n_sweeps, n_points)} of the selection
+        '''
+
+        shapes = {}
+        for cell_id, cell in self.cells.items():
+            sweeps, (i0, i1) = self._resolve(cell)
+            shapes[cell_id] = (len(sweeps), i1 - i0)
+        return shapes
+
+    def times(self, cell_id):
+
+        '''
+        :return: sample times (in seconds) of the selected points of a cell
+        '''
+
+        cell = self.cells[cell_id]
+        sweeps, (i0, i1) = self._resolve(cell)
+        return cell['starting_time'] + np.arange(i0, i1) / cell['rate']
+
+    def read(self, cell_id):
+
+        '''
+        :return: the selected (sweeps x points) data of one cell, in memory
+        '''
+
+        import h5py
+
+        cell = self.cells[cell_id]
+        sweeps, (i0, i1) = self._resolve(cell)
+        with h5py.File(cell['path'], 'r') as h5:
+            return scaledData(h5[seriesPath(self.series, self.recording) + '/data'],
+                              (slice(sweeps.start, sweeps.stop, sweeps.step), slice(i0, i1)))
+
+    def mean(self, dim='sweep', pooled=False):
+
+        '''
+        Mean of the selection over a dimension.
+
+        :param dim:             'sweep' (mean trace of each cell), 'time' (mean of each sweep) or None (one value)
+        :param pooled:          pool the sweeps of all cells (dim 'sweep' or None); the cells must have the same
+                                number of selected points for dim='sweep'
+
+        :return: {cell_id: array} or, pooled, one array; NaN for cells without selected sweeps or points (ValueError
+                 if pooled and no cell has any)
+        '''
+
+        moments = self._moments(dim, pooled)
+        if pooled:
+            return moments[1]
+        return {cell_id: m[1] for cell_id, m in moments.items()}
+
+    def var(self, dim='sweep', pooled=False, ddof=0):
+
+        '''
+        Variance of the selection over a dimension; arguments as for mean, ddof as for np.var.
+        '''
+
+        moments = self._moments(dim, pooled)
+        if pooled:
+            return moments[2] / (moments[0] - ddof)
+        return {cell_id: m[2] / (m[0] - ddof) for cell_id, m in moments.items()}
+
+    def sta(self, window=(-0.1, 0.0), threshold=0.0, refractory=2e-3, pooled=False):
+
+        '''
+        Spike-triggered average of the injected current (ccss) around the spikes of the membrane potential (ccs).
+
+        Spikes are upward crossings of threshold (as in sweepFeatures) within the selected sweeps and time window;
+        spikes whose STA window extends past either end of the sweep are left out.
+
+        :param window:          (start, stop) of the STA window in seconds relative to the spike
+        :param threshold:       spike detection threshold (mV)
+        :param refractory:      minimum interval between two spikes of a sweep (s)
+        :param pooled:          average the spikes of all cells together (the cells must have the same rate)
+
+        :return: lags, sta, n_spikes
+                                lags of the STA points in seconds; sta as {cell_id: array} or, pooled, one array;
+                                n_spikes as {cell_id: count} or, pooled, the total count
+        '''
+
+        tasks, labels = [], []
+        for cell_id, cell in self.cells.items():
+            sweeps, (i0, i1) = self._resolve(cell)
+            lag0, lag1 = int(np.round(window[0] * cell['rate'])), int(np.round(window[1] * cell['rate']))
+            for chunk in _chunks(sweeps, self.chunk_sweeps):
+                tasks.append(('sta', cell['path'], self.recording, chunk, i0, i1,
+                              (lag0, lag1, threshold, refractory * cell['rate'])))
+                labels.append(cell_id)
+
+        sums = {cell_id: 0. for cell_id in self.cells}
+        counts = {cell_id: 0 for cell_id in self.cells}
+        for cell_id, (total, n) in zip(labels, self._run(tasks)):
+            sums[cell_id] = sums.get(cell_id, 0.) + total
+            counts[cell_id] = counts.get(cell_id, 0) + n
+
+        # lags are shared when every cell has the same rate (None otherwise)
+        rates = set(cell['rate'] for cell in self.cells.values())
+        lags = None
+        if len(rates) == 1:
+            rate = rates.pop()
+            lag0 = int(np.round(window[0] * rate))
+            lags = (lag0 + np.arange(int(np.round(window[1] * rate)) - lag0)) / rate
+
+        if pooled:
+            if lags is None:
+                raise ValueError('pooled STA requires every cell to have the same rate')
+            n = sum(counts.values())
+            return lags, sum(sums.values()) / n if n else np.full(len(lags), np.nan), n
+
+        # a cell without spikes in the selection has a NaN STA (with the lags of its own rate)
+        sta = {}
+        for cell_id, cell in self.cells.items():
+            n_lags = int(np.round(window[1] * cell['rate'])) - int(np.round(window[0] * cell['rate']))
+            sta[cell_id] = sums[cell_id] / counts[cell_id] if counts[cell_id] else np.full(n_lags, np.nan)
+        return lags, sta, counts
+
+    # ------------------------------------------------------------------------------------------------------------------
+
+    def _resolve(self, cell):
+
+        # selected sweeps (as a range) and [i0, i1) points of one cell, with times converted like SweepArray.window
+        n_sweeps, n_points = cell['shape']
+        sweeps = range(n_sweeps)[self.sweeps]
+
+        i0 = 0 if self.start is None else timeToIndex(self.start, cell['starting_time'], cell['rate'], n_points)
+        i1 = n_points if self.stop is None else timeToIndex(self.stop, cell['starting_time'], cell['rate'], n_points)
+        return sweeps, (i0, i1)
+
+    def _moments(self, dim, pooled):
+
+        if dim not in ('sweep', 'time', None):
+            raise ValueError("dim must be 'sweep', 'time' or None")
+        if pooled and dim == 'time':
+            raise ValueError("per-sweep means (dim='time') cannot be pooled across cells")
+
+        tasks, labels, empty = [], [], {}
+        for cell_id, cell in self.cells.items():
+            sweeps, (i0, i1) = self._resolve(cell)
+            if not len(sweeps) or i1 <= i0:
+                empty[cell_id] = _emptyMoments(len(sweeps), max(i1 - i0, 0), dim)
+                continue
+            for chunk in _chunks(sweeps, self.chunk_sweeps):
+                tasks.append(('moments', cell['path'], self.recording, chunk, i0, i1, (self.series, dim)))
+                labels.append(cell_id)
+
+        moments = {}
+        for cell_id, m in zip(labels, self._run(tasks)):
+            if cell_id not in moments:
+                moments[cell_id] = m
+            elif dim == 'time':
+                # per-sweep moments of consecutive chunks are concatenated, not merged
+                moments[cell_id] = tuple(np.concatenate([a, b]) for a, b in zip(moments[cell_id], m))
+            else:
+                moments[cell_id] = _merge(moments[cell_id], m)
+
+        if not pooled:
+            # cells without selected sweeps or points get NaN means and variances
+            return {cell_id: moments[cell_id] if cell_id in moments else empty[cell_id] for cell_id in self.cells}
+        if not moments:
+            raise ValueError('the selection is empty: no cell has selected sweeps and points')
+        merged = None
+        for m in moments.values():
+            if merged is not None and np.shape(m[1]) != np.shape(merged[1]):
+                raise ValueError('cells have different numbers of selected points; select a common window')
+            merged = m if merged is None else _merge(merged, m)
+        return merged
+
+    def _run(self, tasks):
+
+        # results are returned in task order; only the (small) partial results are kept in this process
+        if self.workers == 1 or len(tasks) <= 1:
+            return [_reduceChunk(task) for task in tasks]
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            return list(pool.map(_reduceChunk, tasks))
+
+
+def _chunks(sweeps, chunk_sweeps):
+
+    # consecutive (start, stop, step) slices of at most chunk_sweeps sweeps of a range
+    for k in range(0, len(sweeps), chunk_sweeps):
+        part = sweeps[k:k + chunk_sweeps]
+        yield slice(part.start, part.stop, part.step)
+
+
+def _emptyMoments(n_sweeps, n_points, dim):
+
+    # (n, mean, M2) of a selection without samples, whose mean and variance are NaN
+    if dim == 'sweep':
+        return 0, np.full(n_points, np.nan), np.full(n_points, np.nan)
+    if dim == 'time':
+        return np.zeros(n_sweeps), np.full(n_sweeps, np.nan), np.full(n_sweeps, np.nan)
+    return 0, np.float64(np.nan), np.float64(np.nan)
+
+
+def _merge(a, b):
+
+    # combine (n, mean, M2) moments of two disjoint sets of samples (Chan, Golub & LeVeque)
+    na, ma, m2a = a
+    nb, mb, m2b = b
+    n = na + nb
+    delta = mb - ma
+    return n, ma + delta * (nb / n), m2a + m2b + delta ** 2 * (na * nb / n)
+
+
+def _reduceChunk(task):
+
+    # runs in a worker process: read one chunk of one file and reduce it to partial sums
+    import h5py
+
+    op, path, recording, sweeps, i0, i1, args = task
+    with h5py.File(path, 'r') as h5:
+        if op == 'moments':
+            series, dim = args
+            v = scaledData(h5[seriesPath(series, recording) + '/data'], (sweeps, slice(i0, i1))).astype(np.float64)
+            axis = {'sweep': 0, 'time': 1, None: None}[dim]
+            n = v.shape[axis] if axis is not None else v.size
+            mean = v.mean(axis=axis, keepdims=True)
+            m2 = ((v - mean) ** 2).sum(axis=axis)
+            mean = mean.reshape(m2.shape)
+            if dim == 'time':
+                n = np.full(v.shape[0], n, float)
+            return n, mean, m2
+
+        lag0, lag1, threshold, min_interval = args
+        ccs = h5[seriesPath('ccs', recording) + '/data']
+        ccss = h5[seriesPath('ccss', recording) + '/data']
+        n_points = ccs.shape[1]
+        # read enough around the window for the STA windows of spikes near its edges
+        r0, r1 = max(i0 + lag0, 0), min(i1 + lag1, n_points)
+        V = scaledData(ccs, (sweeps, slice(r0, r1)))
+        I = scaledData(ccss, (sweeps, slice(r0, r1))).astype(np.float64)
+        spike_sweeps, points = spikeCrossings(V, threshold, min_interval)
+        points = points + r0
+        keep = (points >= i0) & (points < i1) & (points + lag0 >= r0) & (points + lag1 <= r1)
+        spike_sweeps, points = spike_sweeps[keep], points[keep] - r0
+        if not len(points):
+            return np.zeros(lag1 - lag0), 0
+        # (spikes x window) gather of the current around every spike, summed over spikes
+        windows = I[spike_sweeps[:, None], points[:, None] + np.arange(lag0, lag1)[None, :]]
+        return windows.sum(axis=0), len(points)
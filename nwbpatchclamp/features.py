@@ -0,0 +1,177 @@
+import warnings
+
+import numpy as np
+
+from .utils import sweepChunks
+
+
+class SpikeFeatures(object):
+
+    '''
+    Accumulate resting potential, spike times, firing rate and input-output gain over (sweeps x points) chunks of
+    a current-clamp recording. Every chunk is processed with whole-array NumPy operations; only per-sweep results
+    and spike times are kept, so a recording can be fed through in bounded memory.
+
+    The resting potential of a sweep is the median membrane potential over the samples at which no current is
+    injected (command exactly 0 pA, e.g. the pre-stimulus holding period), plus rmp_offset. It is NaN for sweeps
+    that inject current throughout, or whose command is unknown (NaN).
+
+    :param rate:            sampling rate (Hz)
+    :param threshold:       spike detection threshold (mV); a spike is an upward crossing of it
+    :param refractory:      minimum interval between two spikes of the same sweep (s)
+    :param rmp_offset:      offset between the recorded and the actual membrane potential (mV), added to the
+                            resting potential (the offset argument of writeNWBpatchClamp)
+    '''
+
+    def __init__(self, rate, threshold=0.0, refractory=2e-3, rmp_offset=0.0):
+        self.rate = rate
+        self.threshold = threshold
+        self.refractory = refractory
+        self.rmp_offset = rmp_offset
+        self.n_points = None
+        self.n_sweeps = 0
+        self.rmp = []
+        self.n_spikes = []
+        self.spike_sweeps = []
+        self.spike_times = []
+        self.mean_current = []
+
+    def addSweeps(self, V, I):
+
+        '''
+        :param V:               next (sweeps x points) chunk of the membrane potential (mV), in sweep order
+        :param I:               the same sweeps of the injected current (pA)
+        '''
+
+        V, I = np.atleast_2d(V), np.atleast_2d(I)
+        sweep0 = self.n_sweeps
+        self.n_sweeps += V.shape[0]
+        self.n_points = V.shape[1]
+
+        # median is robust to spikes; only samples without injected current measure the resting potential
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)  # all-NaN sweeps: no current-free samples
+            self.rmp.append(np.nanmedian(np.where(I == 0, V, np.nan), axis=1) + self.rmp_offset)
+
+        sweeps, points = spikeCrossings(V, self.threshold, self.refractory * self.rate)
+
+        self.n_spikes.append(np.bincount(sweeps, minlength=V.shape[0]))
+        self.spike_sweeps.append(sweeps + sweep0)
+        self.spike_times.append(points / self.rate)
+        self.mean_current.append(I.mean(axis=1))
+
+    def result(self):
+
+        '''
+        :return: dict with per-sweep arrays (rmp, n_spikes, firing_rate, mean_current), the spike train as
+                 (spike_sweeps, spike_times) with times in seconds from sweep start, and the cell-level summary
+                 (RMP, firing rate, io_gain in Hz/pA)
+        '''
+
+        rmp = np.concatenate(self.rmp) if self.rmp else np.empty(0)
+        at_rest = rmp[~np.isnan(rmp)]
+        n_spikes = np.concatenate(self.n_spikes) if self.n_spikes else np.empty(0, int)
+        firing_rate = n_spikes / (self.n_points / self.rate) if self.n_points else np.empty(0)
+        mean_current = np.concatenate(self.mean_current) if self.mean_current else np.empty(0)
+
+        # slope of the sweep firing rate against the mean injected current (e.g. across DC levels)
+        if len(mean_current) == len(firing_rate) > 1 and np.ptp(mean_current) > 0:
+            io_gain = np.polyfit(mean_current, firing_rate, 1)[0]
+        else:
+            io_gain = np.nan
+
+        return {'rmp': rmp,
+                'n_spikes': n_spikes,
+                'firing_rate': firing_rate,
+                'mean_current': mean_current,
+                'spike_sweeps': np.concatenate(self.spike_sweeps) if self.spike_sweeps else np.empty(0, int),
+                'spike_times': np.concatenate(self.spike_times) if self.spike_times else np.empty(0),
+                'RMP': float(np.median(at_rest)) if len(at_rest) else np.nan,
+                'firing rate': float(firing_rate.mean()) if len(firing_rate) else np.nan,
+                'io_gain': float(io_gain)}
+
+
+def spikeCrossings(V, threshold, min_interval):
+
+    '''
+    Upward crossings of threshold in every sweep of a (sweeps x points) array.
+
+    :param V:               (sweeps x points) membrane potential
+    :param threshold:       spike detection threshold (same unit as V)
+    :param min_interval:    crossings closer than this many points to the previous one of the same sweep are dropped
+
+    :return: sweeps, points index arrays of the crossings, in sweep then time order
+    '''
+
+    above = V >= threshold
+    sweeps, points = np.nonzero(above[:, 1:] & ~above[:, :-1])
+    points = points + 1
+    if len(points):
+        # drop crossings (e.g. noise around threshold) closer than the refractory period to the previous one
+        keep = np.ones(len(points), bool)
+        keep[1:] = (sweeps[1:] != sweeps[:-1]) | (np.diff(points) >= min_interval)
+        sweeps, points = sweeps[keep], points[keep]
+    return sweeps, points
+
+
+def sweepFeatures(V, I, rate, threshold=0.0, refractory=2e-3, chunk_sweeps=32, conversion=1.0, offset=0.0,
+                  rmp_offset=0.0):
+
+    '''
+    Compute the SpikeFeatures of a recording, chunk_sweeps sweeps at a time.
+
+    :param V:               (sweeps x points) membrane potential array, or an iterable of sweeps (e.g. iterABFsweeps)
+    :param I:               (sweeps x points) command current array, or an iterable of sweeps
+    :param rate:            sampling rate (Hz)
+    :param threshold:       spike detection threshold (mV)
+    :param refractory:      minimum interval between spikes (s)
+    :param chunk_sweeps:    number of sweeps processed at a time
+    :param conversion:      scaling applied to integer (raw ADC) V samples, as for writeNWBpatchClamp(raw=True)
+    :param offset:          offset applied to integer V samples
+    :param rmp_offset:      offset between the recorded and the actual membrane potential (mV), see SpikeFeatures
+
+    :return: dict, see SpikeFeatures.result()
+    '''
+
+    features = SpikeFeatures(rate, threshold, refractory, rmp_offset)
+    for v, i in zip(sweepChunks(V, chunk_sweeps), sweepChunks(I, chunk_sweeps)):
+        if np.issubdtype(v.dtype, np.integer):
+            v = np.add(np.multiply(v.astype(np.float32), np.float32(conversion)), np.float32(offset))
+        features.addSweeps(v, i)
+
+    return features.result()
+
+
+def addFeaturesToNWB(nwbfile, features, sweep_duration, suffix=''):
+
+    '''
+    Store the results of sweepFeatures in a 'features' processing module of an NWBFile (before it is written).
+
+    Per-sweep series are timestamped with the start time of each sweep (sweep number x sweep_duration) and the
+    spike train is stored as spike times in the same time base, with the sweep number as data.
+
+    For a recording appended to a cell file (writeNWBpatchClamp(append=True)) the module is named features<suffix>
+    and refers to ccs<suffix>.
+    '''
+
+    from pynwb import TimeSeries
+
+    ccs = 'ccs' + suffix
+    module = nwbfile.create_processing_module(name='features' + suffix, source='writeNWBpatchClamp',
+                                              description='spike detection and firing features of %s' % ccs)
+
+    sweep_starts = np.arange(len(features['rmp'])) * sweep_duration
+    for name, unit, description in (('rmp', 'mV', 'resting potential of each sweep: median membrane potential '
+                                                  'without injected current, plus the RMP offset'),
+                                    ('firing_rate', 'Hz', 'number of spikes per second of each sweep'),
+                                    ('mean_current', 'pA', 'mean injected current of each sweep')):
+        module.add_container(TimeSeries(name=name, source=ccs, data=features[name], unit=unit,
+                                        timestamps=sweep_starts, description=description))
+
+    module.add_container(TimeSeries(name='spike_times', source=ccs, data=features['spike_sweeps'], unit='sweep',
+                                    timestamps=features['spike_sweeps'] * sweep_duration + features['spike_times'],
+                                    description='threshold crossings of %s; data is the sweep number' % ccs,
+                                    comments='RMP %.3f mV, firing rate %.3f Hz, input-output gain %.4f Hz/pA'
+                                             % (features['RMP'], features['firing rate'], features['io_gain'])))
+
+    return module
@@ -0,0 +1,180 @@
+import os
+import re
+import sqlite3
+import time
+from contextlib import closing
+
+import numpy as np
+
+from .utils import scaledData, readText, seriesPath
+
+# per-file metadata, as written into NWBFile and the ccs/ccss series by writeNWBpatchClamp
+file_columns = ['path', 'mtime_ns', 'size', 'identifier', 'session_description', 'session_start_time',
+                'experiment_description', 'species', 'experiment_condition', 'cell_type', 'protocol', 'notes',
+                'rmp_offset', 'dc', 'gain', 'rate', 'n_sweeps', 'n_points', 'sweep_duration', 'indexed']
+
+# per-recording metadata of every ccs/ccss pair in a file: the series the file was created with (recording '') and
+# those appended with writeNWBpatchClamp(append=True) (recording '<name>' for ccs_<name>/ccss_<name>)
+recording_columns = ['path', 'recording', 'dc', 'gain', 'rate', 'n_sweeps', 'n_points', 'sweep_duration']
+
+# per-sweep summary statistics of the response (v_*) and command (i_*) of every recording
+sweep_columns = ['path', 'recording', 'sweep', 'v_mean', 'v_std', 'v_min', 'v_max', 'i_mean', 'i_std', 'i_min',
+                 'i_max']
+
+
+def _connect(index_path):
+
+    con = sqlite3.connect(index_path, timeout=60)
+    # indexes written before recordings were indexed have no recording column: rebuild them from scratch
+    if con.execute("SELECT 1 FROM sqlite_master WHERE name='sweeps'").fetchone() and \
+            'recording' not in [row[1] for row in con.execute('PRAGMA table_info(sweeps)')]:
+        with con:
+            con.execute('DROP TABLE sweeps')
+            con.execute('DROP TABLE files')
+    con.execute('CREATE TABLE IF NOT EXISTS files (%s, PRIMARY KEY (path))' % ', '.join(file_columns))
+    con.execute('CREATE TABLE IF NOT EXISTS recordings (%s, PRIMARY KEY (path, recording))'
+                % ', '.join(recording_columns))
+    con.execute('CREATE TABLE IF NOT EXISTS sweeps (%s, PRIMARY KEY (path, recording, sweep))'
+                % ', '.join(sweep_columns))
+    for column in ('identifier', 'experiment_condition', 'cell_type', 'gain', 'dc'):
+        con.execute('CREATE INDEX IF NOT EXISTS files_%s ON files (%s)' % (column, column))
+    return con
+
+
+def indexNWBpatchClamp(nwb_dir, index_path=None, chunk_sweeps=32):
+
+    '''
+    Build or update a SQLite index of every NWB file under a directory: one row of metadata per file (files), one
+    row per recording in it (recordings; the recording the file was created with is '', appended ones are named
+    as in writeNWBpatchClamp(append=True)) and one row of summary statistics per sweep of every recording (sweeps).
+    The dc, gain, rate and size columns of files are those of the recording the file was created with.
+
+    Only files that are new or whose mtime/size changed since the last run are opened; entries of deleted files are
+    removed. Files are read with h5py (no pynwb object construction) and sweeps chunk_sweeps at a time.
+
+    :param nwb_dir:         directory containing the NWB files (searched recursively)
+    :param index_path:      SQLite index file (default: nwb_index.sqlite in nwb_dir)
+    :param chunk_sweeps:    number of sweeps read at a time when computing the sweep statistics
+
+    :return: index_path
+    '''
+
+    if index_path is None:
+        index_path = os.path.join(nwb_dir, 'nwb_index.sqlite')
+
+    on_disk = {}
+    for root, dirs, files in os.walk(nwb_dir):
+        for name in files:
+            if name.endswith('.nwb'):
+                path = os.path.abspath(os.path.join(root, name))
+                st = os.stat(path)
+                on_disk[path] = (st.st_mtime_ns, st.st_size)
+
+    with closing(_connect(index_path)) as con:
+        indexed = {path: (mtime_ns, size) for path, mtime_ns, size in con.execute('SELECT path, mtime_ns, size FROM files')}
+
+        removed = [path for path in indexed if path not in on_disk]
+        changed = [path for path, stamp in on_disk.items() if indexed.get(path) != stamp]
+
+        t0 = time.time()
+        failed = 0
+        for path in removed + changed:
+            with con:
+                for table in ('files', 'recordings', 'sweeps'):
+                    con.execute('DELETE FROM %s WHERE path=?' % table, (path,))
+        for path in changed:
+            try:
+                meta, recordings, sweeps = _summarize(path, chunk_sweeps)
+            except (OSError, KeyError) as e:
+                print('could not index %s: %s' % (path, e))
+                failed += 1
+                continue
+            meta['path'] = path
+            meta['mtime_ns'], meta['size'] = on_disk[path]
+            with con:
+                con.execute('INSERT INTO files VALUES (%s)' % ', '.join('?' * len(file_columns)),
+                            [meta.get(c) for c in file_columns])
+                con.executemany('INSERT INTO recordings VALUES (%s)' % ', '.join('?' * len(recording_columns)),
+                                [[path] + [r.get(c) for c in recording_columns[1:]] for r in recordings])
+                con.executemany('INSERT INTO sweeps VALUES (%s)' % ', '.join('?' * len(sweep_columns)),
+                                [[path] + row for row in sweeps])
+
+    print('%s: %d files, %d (re)indexed, %d removed, %d failed in %.2f s'
+          % (index_path, len(on_disk), len(changed) - failed, len(removed), failed, time.time() - t0))
+
+    return index_path
+
+
+def queryIndex(index_path, sql='SELECT * FROM files', params=()):
+
+    '''
+    Query the index, e.g.
+
+        queryIndex(index_path, "SELECT * FROM files WHERE cell_type=? AND gain=?", ('Hu L5', 40.))
+        queryIndex(index_path, "SELECT f.identifier, s.* FROM files f JOIN sweeps s USING (path) WHERE f.dc=?", ('100',))
+        queryIndex(index_path, "SELECT f.identifier, r.* FROM files f JOIN recordings r USING (path) WHERE r.gain=?",
+                   (40.,))
+
+    :return: pandas DataFrame of the result
+    '''
+
+    import pandas as pd
+
+    with closing(_connect(index_path)) as con:
+        return pd.read_sql_query(sql, con, params=params)
+
+
+def _summarize(path, chunk_sweeps):
+
+    import h5py
+
+    with h5py.File(path, 'r') as h5:
+        meta = {'identifier': readText(h5, 'identifier'),
+                'session_description': readText(h5, 'session_description'),
+                'session_start_time': readText(h5, 'session_start_time'),
+                'experiment_description': readText(h5, 'general/experiment_description'),
+                'protocol': readText(h5, 'general/protocol'),
+                'notes': readText(h5, 'general/notes'),
+                'indexed': time.strftime('%Y-%m-%d %H:%M:%S')}
+
+        # writeNWBpatchClamp writes '<species> <experiment_condition> <cell_type>' and 'RMP Offset: <offset>'
+        parts = (meta['experiment_description'] or '').split(' ', 2)
+        if len(parts) == 3:
+            meta['species'], meta['experiment_condition'], meta['cell_type'] = parts
+        m = re.search(r'RMP Offset:\s*(-?[\d.]+)', meta['notes'] or '')
+        meta['rmp_offset'] = float(m.group(1)) if m else None
+
+        recordings, sweeps = [], []
+        for recording, ccs_path, ccss_path in _recordingPaths(h5):
+            ccs = h5[ccs_path]
+            ccss = h5[ccss_path]
+            stimulus = os.path.dirname(ccss_path)
+            description = h5[stimulus].attrs.get('description', '')
+            description = description.decode() if isinstance(description, bytes) else str(description)
+            m = re.match(r'DC(.*)', description)
+            rec = {'recording': recording, 'dc': m.group(1) if m else None,
+                   'gain': float(readText(h5, stimulus + '/gain') or 'nan'),
+                   'rate': float(h5[os.path.dirname(ccs_path) + '/starting_time'].attrs['rate'])}
+            rec['n_sweeps'], rec['n_points'] = (int(n) for n in ccs.shape)
+            rec['sweep_duration'] = rec['n_points'] / rec['rate']
+            recordings.append(rec)
+            if recording == '':
+                meta.update((k, rec[k]) for k in ('dc', 'gain', 'rate', 'n_sweeps', 'n_points', 'sweep_duration'))
+
+            for i0 in range(0, rec['n_sweeps'], chunk_sweeps):
+                v = scaledData(ccs, slice(i0, i0 + chunk_sweeps))
+                c = scaledData(ccss, slice(i0, i0 + chunk_sweeps))
+                stats = np.column_stack([v.mean(1), v.std(1), v.min(1), v.max(1),
+                                         c.mean(1), c.std(1), c.min(1), c.max(1)]).astype(float)
+                sweeps.extend([recording, i0 + k] + row for k, row in enumerate(stats.tolist()))
+
+    return meta, recordings, sweeps
+
+
+def _recordingPaths(h5):
+
+    # (recording, ccs data path, ccss data path) of the series the file was created with ('') and of every
+    # recording appended to it (ccs_<name>/ccss_<name>)
+    appended = [name[len('ccs_'):] for name in sorted(h5['acquisition']) if name.startswith('ccs_')]
+    for recording in [None] + appended:
+        yield recording or '', seriesPath('ccs', recording) + '/data', seriesPath('ccss', recording) + '/data'
@@ -0,0 +1,163 @@
+import json
+import os
+import resource
+import sys
+import time
+import tracemalloc
+
+
+class Instrumentation(object):
+
+    '''
+    Per-stage wall time, I/O volume and memory records for the conversion pipeline and the reader.
+
+    Stages run back to back: stage(name) closes the current stage (if any) and opens the next, done() closes the
+    last one. Each closed stage becomes one record
+
+        {"file", "stage", "wall_s", "bytes_read", "bytes_written", "peak_rss_MB", "peak_traced_MB", "pid", "time"}
+
+    which is kept in .records, appended as a JSON line to log_path, and passed to hook. Bytes are the larger of the
+    process I/O counters (/proc/self/io rchar/wchar, where available) and the volumes reported with count().
+    peak_rss_MB is the process high-water mark so far; peak_traced_MB is the peak of the stage itself, if
+    trace_memory is set (before Python 3.9, the peak of the memory allocated during the stage).
+
+    :param log_path:        JSON lines file to append records to (None to keep them in memory only)
+    :param hook:            callable receiving every record, e.g. to forward it to a metrics system
+    :param profile_dir:     if given, every stage runs under cProfile and its stats are dumped to
+                            <profile_dir>/<file>.<stage>.prof
+    :param trace_memory:    track the peak Python/NumPy allocation of each stage with tracemalloc (slower)
+    '''
+
+    def __init__(self, log_path=None, hook=None, profile_dir=None, trace_memory=False):
+        self.log_path = log_path
+        self.hook = hook
+        self.profile_dir = profile_dir
+        self.trace_memory = trace_memory
+        self.records = []
+        self._current = None
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stage(self, name, file=None):
+
+        '''
+        Close the current stage and start timing the next one.
+
+        :param name:            stage name (e.g. 'load', 'build', 'write')
+        :param file:            file or cell the stage works on (default: that of the previous stage)
+        '''
+
+        previous = self._current
+        self.done()
+        if file is None and previous is not None:
+            file = previous['file']
+
+        profiler = None
+        if self.profile_dir is not None:
+            import cProfile
+            profiler = cProfile.Profile()
+        if self.trace_memory:
+            _resetTracedPeak()
+
+        self._current = {'file': file, 'stage': name, 'counted_read': 0, 'counted_written': 0,
+                         'io': _ioCounters(), 'profiler': profiler, 't0': time.perf_counter()}
+        if profiler is not None:
+            profiler.enable()
+
+    def count(self, bytes_read=0, bytes_written=0):
+
+        '''
+        Report data volume handled by the current stage (e.g. file sizes, for memory-mapped reads or when the OS
+        does not provide I/O counters).
+        '''
+
+        if self._current is not None:
+            self._current['counted_read'] += bytes_read
+            self._current['counted_written'] += bytes_written
+
+    def done(self):
+
+        '''
+        Close the current stage and emit its record.
+
+        :return: the record, or None if no stage was open
+        '''
+
+        current, self._current = self._current, None
+        if current is None:
+            return None
+
+        wall = time.perf_counter() - current['t0']
+        if current['profiler'] is not None:
+            current['profiler'].disable()
+            os.makedirs(self.profile_dir, exist_ok=True)
+            current['profiler'].dump_stats(os.path.join(self.profile_dir, '%s.%s.prof'
+                                                        % (os.path.basename(str(current['file'])), current['stage'])))
+
+        # memory-mapped reads bypass read(), so keep the larger of the OS counters and the reported volumes
+        bytes_read, bytes_written = current['counted_read'], current['counted_written']
+        io = _ioCounters()
+        if io is not None and current['io'] is not None:
+            bytes_read = max(bytes_read, io[0] - current['io'][0])
+            bytes_written = max(bytes_written, io[1] - current['io'][1])
+
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        record = {'file': current['file'], 'stage': current['stage'], 'wall_s': wall,
+                  'bytes_read': bytes_read, 'bytes_written': bytes_written,
+                  'peak_rss_MB': maxrss / (1e6 if sys.platform == 'darwin' else 1e3),
+                  'peak_traced_MB': tracemalloc.get_traced_memory()[1] / 1e6 if self.trace_memory else None,
+                  'pid': os.getpid(), 'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+        self.records.append(record)
+        if self.log_path is not None:
+            with open(self.log_path, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+        if self.hook is not None:
+            self.hook(record)
+
+        return record
+
+    def summary(self):
+
+        '''
+        :return: {stage: total wall time (s)} over all records so far
+        '''
+
+        totals = {}
+        for record in self.records:
+            totals[record['stage']] = totals.get(record['stage'], 0.0) + record['wall_s']
+        return totals
+
+
+def instrumentation(instrument):
+
+    '''
+    :param instrument:      an Instrumentation, a JSON lines log path, or None
+
+    :return: an Instrumentation (records kept in memory only when instrument is None)
+    '''
+
+    if isinstance(instrument, Instrumentation):
+        return instrument
+    return Instrumentation(log_path=instrument)
+
+
+def _ioCounters():
+
+    # characters read/written by this process through read()/write() syscalls (Linux only)
+    try:
+        with open('/proc/self/io') as f:
+            counters = dict(line.split(':') for line in f.read().splitlines() if ':' in line)
+        return int(counters['rchar']), int(counters['wchar'])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _resetTracedPeak():
+
+    # tracemalloc.reset_peak is Python >= 3.9; clear_traces also zeroes the peak, but forgets the blocks allocated
+    # so far, so the stage peak is then that of the memory allocated during the stage
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+    else:
+        tracemalloc.clear_traces()
@@ -0,0 +1,156 @@
+import csv
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+from contextlib import closing
+
+# column layout of the tracking .csv file (see the header comment in write.py)
+csv_columns = ['cell_id', 'cell #', 'recording_date', 'exp_condition', 'cell_type', 'gain', 'dc', 'RMP',
+               'firing rate', 'nwb_create_date', 'analysis_date']
+
+
+def _connect(ledger_path):
+
+    # WAL lets concurrent conversions (e.g. batch workers) read while one of them records; writers wait on the lock
+    con = sqlite3.connect(ledger_path, timeout=60)
+    con.execute('PRAGMA journal_mode=WAL')
+    con.execute('CREATE TABLE IF NOT EXISTS conversions ('
+                'key TEXT PRIMARY KEY, cell_id TEXT, source_path TEXT, source_sha256 TEXT, params TEXT, '
+                'nwb_path TEXT, row TEXT, created TEXT)')
+    con.execute('CREATE INDEX IF NOT EXISTS conversions_cell_id ON conversions (cell_id)')
+    con.execute('CREATE TABLE IF NOT EXISTS sources ('
+                'path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, sha256 TEXT)')
+    return con
+
+
+def sourceHash(ledger_path, file_path):
+
+    '''
+    SHA-256 of a source .abf file. The hash is cached in the ledger against the file's size and mtime, so an
+    unchanged file on a slow volume is only read once.
+
+    :param ledger_path:     path to the SQLite ledger
+    :param file_path:       path to the .abf file
+
+    :return: hex digest
+    '''
+
+    st = os.stat(file_path)
+    cached = cachedSourceHash(ledger_path, file_path, st)
+    if cached is not None:
+        return cached
+
+    h = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    digest = h.hexdigest()
+
+    recordSourceHash(ledger_path, file_path, digest, st)
+    return digest
+
+
+def cachedSourceHash(ledger_path, file_path, st=None):
+
+    '''
+    :param st:              os.stat of file_path, if already taken
+
+    :return: the SHA-256 cached for a source file with its current size and mtime, None if there is none (the
+             file then has to be read to hash it, see sourceHash and recordSourceHash)
+    '''
+
+    st = os.stat(file_path) if st is None else st
+    with closing(_connect(ledger_path)) as con, con:
+        cached = con.execute('SELECT sha256 FROM sources WHERE path=? AND size=? AND mtime_ns=?',
+                             (os.path.abspath(file_path), st.st_size, st.st_mtime_ns)).fetchone()
+    return cached[0] if cached else None
+
+
+def recordSourceHash(ledger_path, file_path, sha256, st):
+
+    '''
+    Cache the SHA-256 of a source file computed elsewhere (e.g. while copying it), against the size and mtime it
+    had when it was read.
+
+    :param st:              os.stat of file_path taken before it was read
+    '''
+
+    with closing(_connect(ledger_path)) as con, con:
+        con.execute('INSERT OR REPLACE INTO sources VALUES (?, ?, ?, ?)',
+                    (os.path.abspath(file_path), st.st_size, st.st_mtime_ns, sha256))
+
+
+def conversionKey(source_sha256, params):
+
+    '''
+    Key of a conversion: the source content hash combined with the conversion parameters.
+
+    :param source_sha256:   content hash of the source .abf file (see sourceHash)
+    :param params:          dict of the writeNWBpatchClamp arguments that determine the output
+
+    :return: hex digest
+    '''
+
+    blob = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha256((source_sha256 + blob).encode()).hexdigest()
+
+
+def lookupConversion(ledger_path, key):
+
+    '''
+    :return: the recorded tracking row (dict) and NWB path of a conversion, or (None, None) if it was never recorded
+    '''
+
+    with closing(_connect(ledger_path)) as con, con:
+        found = con.execute('SELECT row, nwb_path FROM conversions WHERE key=?', (key,)).fetchone()
+    if found is None:
+        return None, None
+    return json.loads(found[0]), found[1]
+
+
+def recordConversion(ledger_path, key, source_path, source_sha256, params, nwb_path, row):
+
+    '''
+    Record a finished conversion. Safe to call from several processes at once: each call is a single-row
+    transaction, and recording the same key again replaces the earlier entry instead of duplicating it.
+    '''
+
+    with closing(_connect(ledger_path)) as con, con:
+        con.execute('INSERT OR REPLACE INTO conversions VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (key, str(row.get('cell_id')), os.path.abspath(source_path), source_sha256,
+                     json.dumps(params, sort_keys=True, default=str), nwb_path, json.dumps(row, default=str),
+                     datetime.datetime.now().isoformat()))
+
+
+def exportTrackingCSV(ledger_path, excel_location):
+
+    '''
+    Write the ledger out in the tracking .csv format, one row per recording: the most recent conversion of each
+    cell_id, or of each recording of a cell converted with writeNWBpatchClamp(append=True).
+
+    :param ledger_path:     path to the SQLite ledger
+    :param excel_location:  path of the .csv file to write
+
+    :return: number of rows written
+    '''
+
+    with closing(_connect(ledger_path)) as con, con:
+        conversions = con.execute('SELECT cell_id, params, row FROM conversions ORDER BY created').fetchall()
+
+    # later conversions of the same (cell_id, recording) replace earlier ones, keeping the order of the latest
+    latest = {}
+    for cell_id, params, row in conversions:
+        recording = (cell_id, json.loads(params).get('append'))
+        latest.pop(recording, None)
+        latest[recording] = json.loads(row)
+
+    rows = list(latest.values())
+    columns = csv_columns + sorted({k for r in rows for k in r} - set(csv_columns))
+    with open(excel_location, 'w', newline='') as f:
+        writer = csv.DictWriter(f, columns)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    return len(rows)
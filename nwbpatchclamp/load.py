@@ -0,0 +1,186 @@
+import numpy as np
+
+
+def loadABFpatchClamp(fpath, channel=0, dtype=np.float64):
+
+    '''
+    Load every sweep of a fixed-length-sweep .abf recording into (sweeps x points) matrices in a single
+    vectorized pass, instead of calling abf.setSweep() twice per sweep.
+
+    The response matrix is a reshaped view of the channel in the ABF's scaled data buffer, and the command
+    matrix is built from one epoch table (or one stimulus waveform broadcast over all sweeps). The values are
+    identical to collecting a.sweepY and a.sweepC sweep by sweep.
+
+    :param fpath:           path to the .abf file (or an already loaded pyabf.ABF object)
+    :param channel:         ABF channel to load (default 0, same as abf.setSweep())
+    :param dtype:           output dtype of the matrices (np.float32 or np.float64)
+
+    :return: V, I, a        response matrix, command matrix and the pyabf.ABF object
+    '''
+
+    import pyabf
+
+    a = fpath if isinstance(fpath, pyabf.ABF) else pyabf.ABF(fpath)
+    _checkFixedLengthSweeps(a)
+
+    if not hasattr(a, 'data'):
+        a.setSweep(0, channel=channel)  # makes pyabf read and scale the data buffer
+
+    nSweeps = a.sweepCount
+    nPoints = a.sweepPointCount
+
+    # response: sweep i of channel c lives at data[c, i*nPoints:(i+1)*nPoints]
+    V = a.data[channel, :nSweeps * nPoints].reshape(nSweeps, nPoints).astype(dtype)
+
+    # command: generated from the protocol, not recorded in the data buffer
+    I = _commandMatrix(a, channel, dtype)
+
+    return V, I, a
+
+
+def loadABFraw(fpath, channel=0, command_dtype=np.float32):
+
+    '''
+    Load the raw 16-bit ADC samples of a fixed-length-sweep .abf recording, unscaled, as a (sweeps x points) int16
+    matrix, together with the scaling pyabf applies to them:
+
+        sweepY = float32(float32(raw * conversion) + offset)
+
+    The command waveform is returned as a scaled matrix, since it is generated from the protocol and has no raw
+    samples. It is float32 by default, the precision pyabf keeps stimulus levels and waveform files in.
+
+    :param fpath:           path to the .abf file (or an already loaded pyabf.ABF object)
+    :param channel:         ABF channel to load (default 0)
+    :param command_dtype:   dtype of the command matrix
+
+    :return: V, conversion, offset, I, a
+    '''
+
+    import pyabf
+
+    a = fpath if isinstance(fpath, pyabf.ABF) else pyabf.ABF(fpath, loadData=False)
+    _checkFixedLengthSweeps(a)
+    conversion, offset = abfScaling(a, channel)
+
+    nSweeps = a.sweepCount
+    nPoints = a.sweepPointCount
+    raw = _rawSamples(a)
+    V = np.ascontiguousarray(raw[:nSweeps * nPoints, channel]).reshape(nSweeps, nPoints)
+    del raw
+
+    I = _commandMatrix(a, channel, command_dtype)
+
+    return V, conversion, offset, I, a
+
+
+def abfScaling(a, channel=0):
+
+    '''
+    :return: conversion, offset     gain and offset (float32 values) that turn raw int16 samples of a channel into sweepY
+    '''
+
+    if a._dtype != np.int16:
+        raise ValueError('%s stores floating point samples, there are no raw integer samples to keep' % a.abfFilePath)
+
+    # pyabf scales float32 data by python floats, i.e. by their float32 values
+    return float(np.float32(a._dataGain[channel])), float(np.float32(a._dataOffset[channel]))
+
+
+def iterABFsweeps(fpath, channel=0, dtype=np.float64, command=False, raw=False):
+
+    '''
+    Yield the sweeps of a fixed-length-sweep .abf recording one at a time, without loading the whole data buffer.
+
+    Response sweeps are read straight from the raw samples on disk (memory-mapped) and scaled exactly as pyabf
+    scales its data buffer, so the values are identical to those returned by loadABFpatchClamp. Only one sweep is
+    held in memory at a time, which makes this suitable for feeding a DataChunkIterator.
+
+    :param fpath:           path to the .abf file (or an already loaded pyabf.ABF object)
+    :param channel:         ABF channel to read (default 0)
+    :param dtype:           dtype of the yielded sweeps (np.float32 or np.float64)
+    :param command:         yield the command waveform (sweepC) instead of the recorded response (sweepY)
+    :param raw:             yield the unscaled int16 response samples (see loadABFraw), ignoring dtype
+
+    :return: generator of 1D arrays, one per sweep
+    '''
+
+    import pyabf
+
+    a = fpath if isinstance(fpath, pyabf.ABF) else pyabf.ABF(fpath, loadData=False)
+    _checkFixedLengthSweeps(a)
+
+    if command:
+        for sweepC in _commandSweeps(a, channel):
+            yield np.asarray(sweepC, dtype)
+        return
+
+    if raw:
+        abfScaling(a, channel)  # raises for floating point ABF files
+
+    nPoints = a.sweepPointCount
+    samples = _rawSamples(a)
+    for i in range(a.sweepCount):
+        if raw:
+            yield np.array(samples[i * nPoints:(i + 1) * nPoints, channel])
+            continue
+        sweepY = samples[i * nPoints:(i + 1) * nPoints, channel].astype(np.float32)
+        if a._dtype == np.int16:
+            # same operations (and float32 rounding) as pyabf.ABF._loadAndScaleData
+            sweepY[:] = np.multiply(sweepY, a._dataGain[channel])
+            sweepY[:] = np.add(sweepY, a._dataOffset[channel])
+        yield sweepY.astype(dtype)
+    del samples
+
+
+def _checkFixedLengthSweeps(a):
+
+    if hasattr(a, '_synchArraySection') and a.sweepCount > 1 and len(set(a._synchArraySection.lLength)) > 1:
+        raise ValueError('%s uses variable-length sweeps, which cannot be stored as a (sweeps x points) matrix'
+                         % a.abfFilePath)
+
+
+def _rawSamples(a):
+
+    # memory-mapped (points x channels) view of the interleaved samples in the ABF data section
+    return np.memmap(a.abfFilePath, dtype=a._dtype, mode='r', offset=a.dataByteStart,
+                     shape=(a.dataPointCount // a.channelCount, a.channelCount))
+
+
+def _commandMatrix(a, channel, dtype):
+
+    I = np.empty((a.sweepCount, a.sweepPointCount), dtype)
+    for i, sweepC in enumerate(_commandSweeps(a, channel)):
+        I[i] = sweepC
+    return I
+
+
+def _commandSweeps(a, channel):
+
+    # yields sweepC for every sweep, building the epoch table only once
+    import pyabf.waveform
+
+    nPoints = a.sweepPointCount
+    if _usesEpochWaveform(a, channel):
+        epochTable = pyabf.waveform.EpochTable(a, channel)
+        for i in range(a.sweepCount):
+            yield epochTable.epochWaveformsBySweep[i].getWaveform()[:nPoints]
+    else:
+        # holding level or a custom stimulus file: the same waveform is played on every sweep
+        sweepC = a.stimulusByChannel[channel].stimulusWaveform(0)[:nPoints]
+        for i in range(a.sweepCount):
+            yield sweepC
+
+
+def _usesEpochWaveform(a, channel):
+
+    # mirrors the waveform source dispatch in pyabf.stimulus.Stimulus.stimulusWaveform()
+    if channel >= len(a.holdingCommand):
+        return False
+    if a.abfVersion['major'] == 1:
+        nWaveformEnable = a._headerV1.nWaveformEnable[channel]
+        nWaveformSource = a._headerV1.nWaveformSource[channel]
+    else:
+        nWaveformEnable = a._dacSection.nWaveformEnable[channel]
+        nWaveformSource = a._dacSection.nWaveformSource[channel]
+
+    return nWaveformEnable != 0 and nWaveformSource == 1
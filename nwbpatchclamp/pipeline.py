@@ -0,0 +1,223 @@
+import hashlib
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import traceback
+
+from .batch import readManifest
+from .write import writeNWBpatchClamp, updateTrackingCSV, conversionParams, excel_location
+from .ledger import cachedSourceHash, recordSourceHash, conversionKey, lookupConversion, \
+    recordConversion
+
+# end of the job stream between pipeline stages
+_done = object()
+
+
+class StageClock(object):
+
+    '''
+    Busy time and bytes moved by one pipeline stage. Time spent waiting on the neighbouring queues is not counted,
+    so busy / elapsed is the utilization of the stage (or of the device it works on).
+    '''
+
+    def __init__(self, name):
+        self.name = name
+        self.busy = 0.0
+        self.bytes = 0
+        self.jobs = 0
+        self._t0 = None
+
+    def start(self):
+        self._t0 = time.perf_counter()
+
+    def stop(self, nbytes=0):
+        self.busy += time.perf_counter() - self._t0
+        self.bytes += nbytes
+        self.jobs += 1
+
+
+def _copyHashing(src, dst, block_size=1 << 20):
+
+    # copy a file and return its SHA-256, reading it once
+    h = hashlib.sha256()
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        for block in iter(lambda: fsrc.read(block_size), b''):
+            h.update(block)
+            fdst.write(block)
+    return h.hexdigest()
+
+
+def pipelineNWBpatchClamp(manifest_path, depth=2, scratch_dir=None, excel_location=excel_location, ledger=None,
+                          **options):
+
+    '''
+    Convert the recordings listed in a manifest with the reads, conversions and writes of consecutive recordings
+    overlapped, for sources and destinations on slow devices (USB volumes, network or synced folders).
+
+    Three stages run concurrently, connected by queues of at most depth recordings each:
+
+        read        (thread)  ledger check, then copy the .abf from its volume to the local scratch directory
+                              (hashing it on the way when the ledger has no hash of it yet, so it is read once)
+        convert     (caller)  writeNWBpatchClamp from the local copy into the scratch directory
+        publish     (thread)  move the NWB file to output_path and record it in the ledger
+
+    so at most 2 x depth + 3 recordings are held in scratch at a time, and a batch takes about as long as its
+    slowest stage rather than the sum of all of them. Recordings unchanged according to the ledger are skipped
+    before they are read. Appended recordings (append=True) are written in place, since they extend the existing
+    cell file. The tracking .csv file is updated once at the end.
+
+    :param manifest_path:   .csv or .yaml manifest (see readManifest)
+    :param depth:           number of recordings each queue between two stages can hold
+    :param scratch_dir:     local directory for the staged .abf and NWB files (default: a new temporary directory)
+    :param excel_location:  tracking .csv file to append the converted cells to (None to skip the update); not
+                            updated when a ledger is given, exportTrackingCSV writes it from the ledger instead
+    :param ledger:          SQLite conversion ledger; unchanged recordings are skipped
+    :param options:         writeNWBpatchClamp arguments applied to every entry unless the manifest sets them
+
+    :return: results, utilization
+                            results: list of per-file result dicts as returned by batchNWBpatchClamp;
+                            utilization: {stage: busy fraction of the wall time}
+    '''
+
+    jobs = [dict(options, **job) for job in readManifest(manifest_path)]
+    print('Converting %d recordings from %s (pipelined, depth %d) ...' % (len(jobs), manifest_path, depth))
+
+    own_scratch = scratch_dir is None
+    scratch = tempfile.mkdtemp(prefix='nwbpatchclamp-') if own_scratch else scratch_dir
+    read_q = queue.Queue(maxsize=depth)
+    publish_q = queue.Queue(maxsize=depth)
+    clocks = {name: StageClock(name) for name in ('read', 'convert', 'publish')}
+    results = []
+
+    def read():
+        for i, job in enumerate(jobs):
+            clock = clocks['read']
+            clock.start()
+            item = {'job': job, 'index': i, 'error': None, 't0': time.time(), 'local': None, 'staged': None,
+                    'key': None, 'sha256': None, 'bytes': 0}
+            try:
+                local_dir = os.path.join(scratch, str(i))
+                os.makedirs(local_dir)
+                local = os.path.join(local_dir, os.path.basename(job['file_path']))
+                if ledger is not None:
+                    st = os.stat(job['file_path'])
+                    item['sha256'] = cachedSourceHash(ledger, job['file_path'], st)
+                    if item['sha256'] is None:
+                        # not hashed yet: the copy has to be made anyway unless the content turns out to be
+                        # converted already, so hash while copying instead of reading the .abf twice
+                        item['sha256'], item['local'] = _copyHashing(job['file_path'], local), local
+                        recordSourceHash(ledger, job['file_path'], item['sha256'], st)
+                    item['key'] = conversionKey(item['sha256'], conversionParams(**job))
+                    prior_row, prior_nwb = lookupConversion(ledger, item['key'])
+                    if prior_row is not None and os.path.exists(prior_nwb):
+                        item['skipped'] = True
+                if item.get('skipped'):
+                    if item['local'] is not None:
+                        os.remove(item['local'])
+                        item['local'] = None
+                else:
+                    if item['local'] is None:
+                        item['local'] = local
+                        shutil.copyfile(job['file_path'], local)
+                    item['bytes'] = os.path.getsize(local)
+            except Exception:
+                item['error'] = traceback.format_exc()
+            clock.stop(item['bytes'])
+            read_q.put(item)
+        read_q.put(_done)
+
+    def publish():
+        while True:
+            item = publish_q.get()
+            if item is _done:
+                return
+            clock = clocks['publish']
+            clock.start()
+            job, nbytes = item['job'], 0
+            if item['error'] is None and item.get('row') is not None:
+                try:
+                    nwb_path = job.get('output_path', '') + '%s.nwb' % job.get('cell_id', '')
+                    if item['staged'] is not None:
+                        nbytes = os.path.getsize(item['staged'])
+                        shutil.move(item['staged'], nwb_path)
+                    if ledger is not None:
+                        recordConversion(ledger, item['key'], job['file_path'], item['sha256'],
+                                         conversionParams(**job), nwb_path, item['row'])
+                except Exception:
+                    item['error'] = traceback.format_exc()
+            shutil.rmtree(os.path.join(scratch, str(item['index'])), ignore_errors=True)
+            clock.stop(nbytes)
+
+            result = {'cell_id': job.get('cell_id'), 'file_path': job.get('file_path'),
+                      'row': None if item['error'] else item.get('row'), 'error': item['error'],
+                      'seconds': time.time() - item['t0'], 'bytes': item['bytes']}
+            results.append(result)
+            status = 'FAILED' if result['error'] else 'skipped' if result['row'] is None else 'ok'
+            print('[%d/%d] %s %s (%.1f s)' % (len(results), len(jobs), result['cell_id'], status, result['seconds']))
+
+    reader = threading.Thread(target=read, name='nwbpatchclamp-read', daemon=True)
+    publisher = threading.Thread(target=publish, name='nwbpatchclamp-publish', daemon=True)
+    t0 = time.perf_counter()
+    reader.start()
+    publisher.start()
+
+    # ----------------------------------------------------------------------------------------------------------------------
+    # Convert, on this thread, whatever the reader has staged
+    # ----------------------------------------------------------------------------------------------------------------------
+
+    while True:
+        item = read_q.get()
+        if item is _done:
+            break
+        if item['error'] is None and not item.get('skipped'):
+            clock = clocks['convert']
+            clock.start()
+            job = item['job']
+            try:
+                if job.get('append'):
+                    output_path = job.get('output_path', '')
+                else:
+                    output_path = os.path.dirname(item['local']) + os.sep
+                    item['staged'] = output_path + '%s.nwb' % job.get('cell_id', '')
+                item['row'] = writeNWBpatchClamp(**dict(job, file_path=item['local'], output_path=output_path,
+                                                        excel_location=None, ledger=None))
+            except Exception:
+                item['error'] = traceback.format_exc()
+            os.remove(item['local'])
+            clock.stop(os.path.getsize(item['staged']) if item['staged'] and os.path.exists(item['staged']) else 0)
+        publish_q.put(item)
+
+    publish_q.put(_done)
+    reader.join()
+    publisher.join()
+    elapsed = time.perf_counter() - t0
+    if own_scratch:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    converted = [r for r in results if r['error'] is None and r['row'] is not None]
+    failed = [r for r in results if r['error'] is not None]
+    if excel_location is not None and ledger is None and converted:
+        updateTrackingCSV(excel_location, [r['row'] for r in converted])
+
+    # ----------------------------------------------------------------------------------------------------------------------
+    # Summary
+    # ----------------------------------------------------------------------------------------------------------------------
+
+    utilization = {name: clock.busy / elapsed if elapsed else 0. for name, clock in clocks.items()}
+    print('')
+    print('%d converted, %d skipped, %d failed in %.1f s'
+          % (len(converted), len(results) - len(converted) - len(failed), len(failed), elapsed))
+    for name, clock in clocks.items():
+        print('    %-8s %5.1f%% busy, %7.1f s, %8.1f MB (%.1f MB/s while busy)'
+              % (name, 100 * utilization[name], clock.busy, clock.bytes / 1e6,
+                 clock.bytes / 1e6 / clock.busy if clock.busy else 0.))
+    if clocks['convert'].jobs:
+        print('    limited by %s' % max(utilization, key=utilization.get))
+    for r in failed:
+        print('FAILED %s (%s):' % (r['cell_id'], r['file_path']))
+        print('    ' + r['error'].strip().splitlines()[-1])
+
+    return results, utilization
@@ -0,0 +1,150 @@
+import numpy as np
+
+from .utils import sweepChunks, scaledData, seriesName, seriesPath, timeToIndex
+
+
+def minMaxPyramid(sweeps, factor=8, levels=4, chunk_sweeps=32):
+
+    '''
+    Min/max envelope pyramid of a (sweeps x points) recording, for drawing zoomed-out traces.
+
+    Level k (1..levels) holds, for every sweep, the minimum and maximum of consecutive bins of factor**k points;
+    the last bin of a sweep may be shorter. Level 1 is computed from the data, each further level from the one
+    below it, chunk_sweeps sweeps at a time, so an iterator of sweeps (e.g. iterABFsweeps) is read only once.
+    Values keep the dtype of the data (e.g. raw int16 samples, to be scaled like the series itself).
+
+    :param sweeps:          (sweeps x points) array, or iterable of 1D sweeps
+    :param factor:          decimation factor between two consecutive levels (and of level 1)
+    :param levels:          number of levels
+    :param chunk_sweeps:    number of sweeps processed at a time
+
+    :return: list of (sweeps x bins x 2) arrays, [..., 0] the minima and [..., 1] the maxima, finest level first
+    '''
+
+    pyramid = [[] for _ in range(levels)]
+    for chunk in sweepChunks(sweeps, chunk_sweeps):
+        lo = hi = np.atleast_2d(chunk)
+        for k in range(levels):
+            lo, hi = _decimate(lo, np.minimum, factor), _decimate(hi, np.maximum, factor)
+            pyramid[k].append(np.stack([lo, hi], axis=-1))
+
+    return [np.concatenate(level) if level else np.empty((0, 0, 2)) for level in pyramid]
+
+
+def addPyramidToNWB(nwbfile, pyramids, rate, factor=8, suffix=''):
+
+    '''
+    Store the levels of minMaxPyramid in a 'pyramid' processing module of an NWBFile (before it is written), as
+    TimeSeries <series>_L<k> of (sweeps x bins x 2) data whose rate is that of the series divided by factor**k.
+
+    :param nwbfile:         NWBFile to add the module to
+    :param pyramids:        {series name: (levels, unit, scaling)}, scaling being the conversion keyword argument
+                            of the series (empty for float data); the offset of raw series is added to the data
+                            attributes of the levels once the file is written, as for the series itself
+    :param rate:            sampling rate of the series (Hz)
+    :param factor:          decimation factor used by minMaxPyramid
+    :param suffix:          recording suffix of an appended recording (see writeNWBpatchClamp(append=True))
+    '''
+
+    from pynwb import TimeSeries
+
+    module = nwbfile.create_processing_module(name='pyramid' + suffix, source='writeNWBpatchClamp',
+                                              description='min/max envelope pyramids for trace display')
+
+    for name, (levels, unit, scaling) in pyramids.items():
+        for k, level in enumerate(levels, 1):
+            module.add_container(TimeSeries(name='%s%s_L%d' % (name, suffix, k), source=name + suffix, data=level,
+                                            unit=unit, rate=rate / factor ** k, starting_time=0.0,
+                                            description='min/max of %s over bins of %d points; last axis is '
+                                                        '(min, max)' % (name + suffix, factor ** k),
+                                            **scaling))
+
+    return module
+
+
+class NWBEnvelope(object):
+
+    '''
+    Read the part of a sweep shown in a time window at a given pixel width, from the coarsest pyramid level that
+    still has at least one bin per pixel (or from the series itself when the window is too short for level 1):
+
+        with NWBEnvelope(fpath) as env:
+            t, lo, hi = env.window(sweep=3, pixels=1500)                    # whole sweep
+            t, lo, hi = env.window(sweep=3, start=0.50, stop=0.51, pixels=1500)
+
+    Only the bins of the window in the chosen level are read, so a zoomed-out view of any sweep costs about
+    2 x pixels values however long the recording. Files written without pyramid=True are read from the series.
+
+    :param fpath:           NWB file written by writeNWBpatchClamp(pyramid=True)
+    :param series:          'ccs' or 'ccss'
+    :param recording:       name of an appended recording (None for the series the file was created with)
+    '''
+
+    def __init__(self, fpath, series='ccs', recording=None):
+        import h5py
+
+        self.h5 = h5py.File(fpath, 'r')
+        name = seriesName(series, recording)
+        self.series = self.h5[seriesPath(series, recording)]
+        self.rate = float(self.series['starting_time'].attrs['rate'])
+        self.starting_time = float(self.series['starting_time'][()])
+        self.n_points = self.series['data'].shape[1]
+
+        # (points per bin, dataset) of every level, finest first
+        self.levels = []
+        module = 'processing/pyramid' + ('' if recording is None else '_' + recording)
+        k = 1
+        while '%s/%s_L%d' % (module, name, k) in self.h5:
+            level = self.h5['%s/%s_L%d' % (module, name, k)]
+            self.levels.append((int(round(self.rate / level['starting_time'].attrs['rate'])), level['data']))
+            k += 1
+
+    def window(self, sweep=0, start=None, stop=None, pixels=1000):
+
+        '''
+        :param sweep:           sweep index
+        :param start:           window start in seconds (None for the start of the sweep)
+        :param stop:            window end in seconds, exclusive (None for the end of the sweep)
+        :param pixels:          number of horizontal pixels the window is drawn on
+
+        :return: t, lo, hi      start time of each bin (s) and the minimum and maximum of the trace in it; read
+                                from the series itself, lo and hi are both the samples
+        '''
+
+        i0 = 0 if start is None else self._index(start)
+        i1 = self.n_points if stop is None else self._index(stop)
+
+        for step, data in reversed(self.levels):
+            b0, b1 = i0 // step, -(-i1 // step)
+            if b1 - b0 >= pixels:
+                lohi = scaledData(data, (sweep, slice(b0, b1)))
+                lo, hi = lohi[:, 0], lohi[:, 1]
+                if np.float32(data.attrs.get('conversion', 1.0)) < 0:
+                    lo, hi = hi, lo  # a negative gain swaps the scaled minima and maxima
+                return self.starting_time + np.arange(b0, b1) * step / self.rate, lo, hi
+
+        v = scaledData(self.series['data'], (sweep, slice(i0, i1)))
+        return self.starting_time + np.arange(i0, i1) / self.rate, v, v
+
+    def _index(self, t):
+
+        return timeToIndex(t, self.starting_time, self.rate, self.n_points)
+
+    def close(self):
+        self.h5.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _decimate(x, reduce, factor):
+
+    # reduce consecutive bins of factor points of every row; the last bin is padded with its own last value
+    n_bins = -(-x.shape[1] // factor)
+    pad = n_bins * factor - x.shape[1]
+    if pad:
+        x = np.concatenate([x, np.repeat(x[:, -1:], pad, axis=1)], axis=1)
+    return reduce.reduce(x.reshape(x.shape[0], n_bins, factor), axis=2)
@@ -0,0 +1,178 @@
+import numpy as np
+
+from .instrument import instrumentation
+from .utils import seriesName, timeToIndex
+
+def readNWBpatchClamp(fpath, instrument=None, recording=None):
+
+    '''
+    Read a whole NWB file written by writeNWBpatchClamp into memory.
+
+    Every sweep of both series is loaded (and scaled, for raw int16 files) and the file is closed, so the returned
+    ccss/ccs objects can no longer be read from. Use NWBpatchClampReader to read only some sweeps or a time window.
+
+    :param fpath:           path to the NWB file
+    :param instrument:      Instrumentation (or JSON lines log path) recording the 'open' and 'read' stages
+    :param recording:       name of a recording appended to the file (writeNWBpatchClamp(append=True)); None for
+                            the ccss/ccs series the file was created with
+
+    :return: nwbfile, ccss, ccs, current_stimulus, current_clamp
+    '''
+
+    from pynwb import NWBHDF5IO
+
+    inst = instrumentation(instrument)
+    inst.stage('open', file=fpath)
+
+    # read nwb file for the chosen file
+    io = NWBHDF5IO(fpath, 'r')
+    nwbfile = io.read()
+
+    inst.stage('read')
+
+    # current input
+    ccss = nwbfile.get_stimulus(seriesName('ccss', recording))
+    current_stimulus = SweepArray(ccss)[()]
+
+    # current output
+    ccs = nwbfile.get_acquisition(seriesName('ccs', recording))
+    current_clamp = SweepArray(ccs)[()]
+
+    io.close()
+    inst.count(bytes_read=current_stimulus.nbytes + current_clamp.nbytes)
+    inst.done()
+
+    return nwbfile, ccss, ccs, current_stimulus, current_clamp
+
+
+class NWBpatchClampReader(object):
+
+    '''
+    Keep an NWB file written by writeNWBpatchClamp open and read its sweeps lazily.
+
+        with NWBpatchClampReader(fpath) as nwb:
+            v = nwb.current_clamp[3:6]                          # sweeps 3-5, all points
+            i = nwb.current_stimulus[:, :1000]                  # first 1000 points of every sweep
+            v = nwb.current_clamp.window(0.5, 1.5, sweeps=2)    # 0.5-1.5 s of sweep 2
+
+    Only the requested hyperslab is read from the HDF5 file. Recordings appended to a cell file are selected with
+    recording; the names of all recordings in the file are listed in .recordings (None is the first one).
+
+    :param fpath:           path to the NWB file
+    :param instrument:      Instrumentation (or JSON lines log path) recording the 'open' stage and every 'read'
+    :param recording:       name of an appended recording (None for the ccss/ccs series the file was created with)
+    '''
+
+    def __init__(self, fpath, instrument=None, recording=None):
+        from pynwb import NWBHDF5IO
+
+        self.fpath = fpath
+        self.instrument = None if instrument is None else instrumentation(instrument)
+        if self.instrument is not None:
+            self.instrument.stage('open', file=fpath)
+        self.io = NWBHDF5IO(fpath, 'r')
+        self.nwbfile = self.io.read()
+        self.recordings = [None if name == 'ccs' else name[len('ccs_'):]
+                           for name in sorted(self.nwbfile.acquisition) if name == 'ccs' or name.startswith('ccs_')]
+        self.ccss = self.nwbfile.get_stimulus(seriesName('ccss', recording))
+        self.ccs = self.nwbfile.get_acquisition(seriesName('ccs', recording))
+        self.current_stimulus = SweepArray(self.ccss, self.instrument)
+        self.current_clamp = SweepArray(self.ccs, self.instrument)
+        if self.instrument is not None:
+            self.instrument.done()
+
+    def close(self):
+        self.io.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class SweepArray(object):
+
+    '''
+    Lazy (sweeps x points) view of the data of a ccs/ccss series.
+
+    Index it like a NumPy array (sweeps first, points second) or use window() to select a time range in seconds,
+    converted to points with the series rate and starting_time.
+
+    Series stored as raw integer samples (writeNWBpatchClamp(raw=True)) are scaled on access with the series
+    conversion and offset, in float32 like pyabf, so the values match a float conversion of the same recording.
+    The offset is the offset attribute of the data (the series offset of pynwb >= 2.1, written with h5py under
+    pynwb 0.5).
+    '''
+
+    def __init__(self, series, instrument=None):
+        self.series = series
+        self.instrument = instrument
+        self.data = series.data
+        self.rate = series.rate
+        self.starting_time = series.starting_time or 0.0
+        self.scaled = np.issubdtype(self.data.dtype, np.integer)
+        self.conversion = np.float32(series.conversion)
+        self.offset = np.float32(getattr(series, 'offset', None) or getattr(self.data, 'attrs', {}).get('offset', 0.0))
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    @property
+    def dtype(self):
+        return np.dtype(np.float32) if self.scaled else self.data.dtype
+
+    def __len__(self):
+        return self.data.shape[0]
+
+    def __getitem__(self, key):
+        if self.instrument is not None:
+            self.instrument.stage('read', file=self.series.name)
+        values = self.data[key]
+        if self.instrument is not None:
+            self.instrument.count(bytes_read=np.asarray(values).nbytes)
+            self.instrument.done()
+        if not self.scaled:
+            return values
+        values = np.asarray(values, np.float32)
+        np.multiply(values, self.conversion, out=values)
+        np.add(values, self.offset, out=values)
+        return values
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self[()], dtype)
+
+    def timeToIndex(self, t):
+
+        '''
+        :return: index of the first point at or after time t (seconds), clipped to the sweep length
+        '''
+
+        return timeToIndex(t, self.starting_time, self.rate, self.shape[1])
+
+    def window(self, start=None, stop=None, sweeps=slice(None)):
+
+        '''
+        Read the points between two times (in seconds) of the selected sweeps.
+
+        :param start:           window start in seconds (None for the start of the sweep)
+        :param stop:            window end in seconds, exclusive (None for the end of the sweep)
+        :param sweeps:          sweep index, slice, or list of sweep indices
+
+        :return: array of the requested sweeps x points
+        '''
+
+        i0 = 0 if start is None else self.timeToIndex(start)
+        i1 = self.shape[1] if stop is None else self.timeToIndex(stop)
+        return self[sweeps, i0:i1]
+
+    def times(self, start=None, stop=None):
+
+        '''
+        :return: sample times (in seconds) of the points returned by window(start, stop)
+        '''
+
+        i0 = 0 if start is None else self.timeToIndex(start)
+        i1 = self.shape[1] if stop is None else self.timeToIndex(stop)
+        return self.starting_time + np.arange(i0, i1) / self.rate
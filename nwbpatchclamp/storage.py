@@ -0,0 +1,131 @@
+import os
+
+import numpy as np
+
+from .utils import seriesPath
+
+# named HDF5 storage profiles for the ccs/ccss datasets
+#   chunks:             'sweep' (one chunk per sweep), a time window in seconds, or an explicit chunk shape
+#   compression:        'gzip', 'lzf' or None
+#   compression_opts:   compression level (gzip only, 0-9)
+#   shuffle:            apply the HDF5 byte-shuffle filter before compressing
+storage_profiles = {
+    'contiguous': None,
+    'analysis': {'chunks': 'sweep', 'compression': 'lzf', 'compression_opts': None, 'shuffle': True},
+    'archive': {'chunks': 'sweep', 'compression': 'gzip', 'compression_opts': 9, 'shuffle': True},
+    'window': {'chunks': 1.0, 'compression': 'gzip', 'compression_opts': 4, 'shuffle': True},
+}
+
+# location of the series data inside a file written by writeNWBpatchClamp
+series_paths = {name: seriesPath(name) + '/data' for name in ('ccs', 'ccss')}
+
+
+def wrapStorage(data, shape, rate, storage=None):
+
+    '''
+    Wrap a ccs/ccss data array (or DataChunkIterator) so NWBHDF5IO writes it with the given storage profile.
+
+    :param data:            (sweeps x points) array or DataChunkIterator
+    :param shape:           (sweeps, points) shape of the full dataset
+    :param rate:            sampling rate of the series (Hz), used to convert a time-window chunk size to points
+    :param storage:         name of a profile in storage_profiles, a profile dict, or None to leave the layout to
+                            NWBHDF5IO (see contiguousData)
+
+    :return: data, unchanged or wrapped in H5DataIO
+    '''
+
+    if isinstance(storage, str):
+        if storage not in storage_profiles:
+            raise ValueError("unknown storage profile '%s' (must be one of %s)" % (storage, sorted(storage_profiles)))
+        storage = storage_profiles[storage]
+    if storage is None:
+        return data
+
+    try:
+        from hdmf.backends.hdf5.h5_utils import H5DataIO
+    except ImportError:  # older pynwb releases bundle hdmf as pynwb.form
+        from pynwb.form.backends.hdf5.h5_utils import H5DataIO
+
+    chunks = storage.get('chunks', 'sweep')
+    nPoints = shape[1]
+    if chunks == 'sweep':
+        chunks = (1, nPoints)
+    elif isinstance(chunks, (int, float)):
+        chunks = (1, int(min(nPoints, max(1, round(chunks * rate)))))
+    else:
+        chunks = tuple(chunks)
+
+    return H5DataIO(data=data, chunks=chunks,
+                    compression=storage.get('compression'),
+                    compression_opts=storage.get('compression_opts'),
+                    shuffle=storage.get('shuffle', False))
+
+
+def contiguousData(data, shape):
+
+    '''
+    Wrap a DataChunkIterator of (sweeps x points) data so NWBHDF5IO writes it, chunk by chunk, into a contiguous
+    dataset of the full shape, as it writes arrays, instead of the chunked, resizable dataset it creates for
+    iterative writes.
+
+    :param data:            DataChunkIterator
+    :param shape:           (sweeps, points) shape of the full dataset
+
+    :return: data wrapped in H5DataIO
+    '''
+
+    try:
+        from hdmf.backends.hdf5.h5_utils import H5DataIO
+    except ImportError:  # older pynwb releases bundle hdmf as pynwb.form
+        from pynwb.form.backends.hdf5.h5_utils import H5DataIO
+
+    class ContiguousDataIO(H5DataIO):
+
+        # H5DataIO drops the settings left to None, which h5py needs to create an unchunked dataset
+        @property
+        def io_settings(self):
+            return {'shape': tuple(shape), 'maxshape': None, 'chunks': None}
+
+    return ContiguousDataIO(data=data)
+
+
+def storageReport(nwb_path, write_seconds, series=None):
+
+    '''
+    Report the on-disk size, compression ratio and write throughput of the ccs/ccss datasets of an NWB file.
+
+    :param nwb_path:        path to the NWB file written by writeNWBpatchClamp
+    :param write_seconds:   wall time taken by NWBHDF5IO.write for that file
+    :param series:          {name: HDF5 dataset path} of the series to report (default: series_paths)
+
+    :return: dict with the per-series and whole-file numbers (also printed)
+    '''
+
+    import h5py
+
+    series = series_paths if series is None else series
+    report = {'file': nwb_path, 'file_bytes': os.path.getsize(nwb_path), 'write_seconds': write_seconds}
+    raw_total = 0
+    with h5py.File(nwb_path, 'r') as h5:
+        for name, path in series.items():
+            if path not in h5:
+                continue
+            dset = h5[path]
+            raw = dset.size * dset.dtype.itemsize
+            stored = dset.id.get_storage_size()
+            raw_total += raw
+            report[name] = {'raw_bytes': raw, 'stored_bytes': stored,
+                            'ratio': raw / stored if stored else np.nan,
+                            'chunks': dset.chunks, 'compression': dset.compression}
+
+    report['throughput_MBps'] = raw_total / 1e6 / write_seconds if write_seconds > 0 else np.nan
+
+    print('%s: %.1f MB on disk, %.1f MB/s write' % (os.path.basename(nwb_path), report['file_bytes'] / 1e6,
+                                                   report['throughput_MBps']))
+    for name in series:
+        if name in report:
+            r = report[name]
+            print('    %-5s %9.1f MB -> %9.1f MB  (ratio %.2f, chunks %s, %s)'
+                  % (name, r['raw_bytes'] / 1e6, r['stored_bytes'] / 1e6, r['ratio'], r['chunks'], r['compression']))
+
+    return report
@@ -0,0 +1,73 @@
+import numpy as np
+
+
+def syntheticPatchClamp(n_sweeps=20, sweep_duration=2.0, rate=10e4, dc=80.0, noise_sd=1000.0, rmp=-65.0,
+                        resistance=0.15, tau=0.02, threshold=-50.0, holding=1 / 64., seed=0):
+
+    '''
+    Generate a synthetic white-noise current-clamp recording, with every sweep computed at once.
+
+    The command is 0 pA for the first holding fraction of each sweep (the pre-stimulus holding period of an ABF
+    episode, 1/64 of the sweep) and DC plus Gaussian white noise after it. The membrane potential is the command
+    low-pass filtered by a passive membrane (time constant tau, input resistance in GOhm so pA x GOhm = mV) around
+    rmp, so it sits at rmp during the holding period, with a 1 ms spike to +30 mV pasted in at each upward crossing
+    of threshold.
+
+    :param n_sweeps:        number of sweeps
+    :param sweep_duration:  sweep length (s)
+    :param rate:            sampling rate (Hz)
+    :param dc:              DC level of the command (pA)
+    :param noise_sd:        standard deviation of the white-noise command (pA)
+    :param rmp:             resting membrane potential (mV)
+    :param resistance:      input resistance (GOhm)
+    :param tau:             membrane time constant (s)
+    :param threshold:       spike threshold (mV)
+    :param holding:         fraction of each sweep before the stimulus, without injected current
+    :param seed:            random seed
+
+    :return: V, I           (sweeps x points) membrane potential (mV) and command current (pA) matrices
+    '''
+
+    rng = np.random.default_rng(seed)
+    n_points = int(round(sweep_duration * rate))
+
+    I = dc + noise_sd * rng.standard_normal((n_sweeps, n_points))
+    I[:, :int(holding * n_points)] = 0.0
+
+    # passive membrane: first-order low-pass of the command, applied in the frequency domain (zero-padded, so the
+    # end of a sweep does not wrap around into its holding period)
+    f = np.fft.rfftfreq(2 * n_points, 1.0 / rate)
+    V = np.fft.irfft(np.fft.rfft(I, n=2 * n_points, axis=1) / (1 + 2j * np.pi * f * tau), n=2 * n_points, axis=1)
+    V = rmp + resistance * V[:, :n_points]
+
+    # spikes: 1 ms at +30 mV from each upward threshold crossing
+    above = V >= threshold
+    sweeps, points = np.nonzero(above[:, 1:] & ~above[:, :-1])
+    width = max(1, int(1e-3 * rate))
+    spike = (sweeps[:, None], np.minimum(points[:, None] + 1 + np.arange(width), n_points - 1))
+    V[spike] = 30.0
+
+    return V, I
+
+
+def writeSyntheticABF(fpath, n_sweeps=20, sweep_duration=2.0, rate=10e4, **kwargs):
+
+    '''
+    Write the membrane potential of a syntheticPatchClamp recording as an ABF1 file with pyabf.
+
+    pyabf's ABF writer stores the recorded channel only, without a protocol, so the command is not in the file: its
+    sweepC is NaN, and so are the ccss series of an NWB file converted from it and the features computed from the
+    command (rmp, mean_current, io_gain). Use the returned I where the command is needed.
+
+    :param fpath:           path of the .abf file to write
+    :param kwargs:          passed to syntheticPatchClamp
+
+    :return: V, I           the generated membrane potential (as written) and command (not written) matrices
+    '''
+
+    import pyabf.abfWriter
+
+    V, I = syntheticPatchClamp(n_sweeps=n_sweeps, sweep_duration=sweep_duration, rate=rate, **kwargs)
+    pyabf.abfWriter.writeABF1(V, fpath, sampleRateHz=rate, units='mV')
+
+    return V, I
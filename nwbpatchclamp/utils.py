@@ -0,0 +1,108 @@
+'''
+Helpers shared by the readers, the index, the cohort reductions and the pyramids: chunking of sweep iterables,
+names and paths of the series, time to point index conversion, and h5py-level access to the datasets and text
+fields written by writeNWBpatchClamp.
+'''
+
+import numpy as np
+
+
+def sweepChunks(sweeps, chunk_sweeps):
+
+    '''
+    Split a recording into (sweeps x points) chunks of at most chunk_sweeps sweeps.
+
+    :param sweeps:          (sweeps x points) array (sliced, not copied), or iterable of 1D sweeps (stacked)
+    :param chunk_sweeps:    number of sweeps per chunk
+
+    :return: generator of 2D arrays, in sweep order
+    '''
+
+    if isinstance(sweeps, np.ndarray):
+        for i0 in range(0, len(sweeps), chunk_sweeps):
+            yield sweeps[i0:i0 + chunk_sweeps]
+        return
+
+    chunk = []
+    for sweep in sweeps:
+        chunk.append(sweep)
+        if len(chunk) == chunk_sweeps:
+            yield np.vstack(chunk)
+            chunk = []
+    if chunk:
+        yield np.vstack(chunk)
+
+
+def scaledData(dset, key):
+
+    '''
+    Read part of an h5py dataset of a series; raw integer samples (writeNWBpatchClamp(raw=True)) are returned as
+    float32 value x conversion + offset from the dataset attributes, the same scaling as read.SweepArray.
+
+    :param dset:            h5py dataset (the data of a series or of a pyramid level)
+    :param key:             index or slice(s) to read
+
+    :return: numpy array, float data as stored
+    '''
+
+    values = dset[key]
+    if np.issubdtype(values.dtype, np.integer):
+        values = values.astype(np.float32)
+        np.multiply(values, np.float32(dset.attrs.get('conversion', 1.0)), out=values)
+        np.add(values, np.float32(dset.attrs.get('offset', 0.0)), out=values)
+    return values
+
+
+def readText(h5, path):
+
+    '''
+    :param h5:              open h5py.File
+    :param path:            path of a text (or scalar) dataset in it
+
+    :return: the value as str, None if the dataset does not exist
+    '''
+
+    if path not in h5:
+        return None
+    value = h5[path][()]
+    if isinstance(value, np.ndarray):
+        value = value.ravel()[0] if value.size else ''
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+def seriesName(name, recording):
+
+    '''
+    :param name:            'ccs' or 'ccss'
+    :param recording:       name of an appended recording (None for the series the file was created with)
+
+    :return: name of the series of that recording in the NWB file
+    '''
+
+    return name if recording is None else '%s_%s' % (name, recording)
+
+
+def seriesPath(name, recording=None):
+
+    '''
+    :param name:            'ccs' or 'ccss'
+    :param recording:       name of an appended recording (None for the series the file was created with)
+
+    :return: HDF5 path of the group of that series in the NWB file (its samples are in <path>/data)
+    '''
+
+    return '%s/%s' % ('acquisition' if name == 'ccs' else 'stimulus/presentation', seriesName(name, recording))
+
+
+def timeToIndex(t, starting_time, rate, n_points):
+
+    '''
+    :param t:               time (seconds)
+    :param starting_time:   time of the first point of the sweeps (seconds)
+    :param rate:            sampling rate (Hz)
+    :param n_points:        number of points per sweep
+
+    :return: index of the first point at or after time t, clipped to [0, n_points]
+    '''
+
+    return int(min(max(np.ceil((t - starting_time) * rate - 1e-9), 0), n_points))
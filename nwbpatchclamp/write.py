@@ -0,0 +1,453 @@
+import numpy as np
+import datetime
+import os
+import shutil
+import tempfile
+import time
+
+from .load import loadABFpatchClamp, loadABFraw, iterABFsweeps, abfScaling
+from .storage import wrapStorage, contiguousData, storageReport
+from .features import sweepFeatures, addFeaturesToNWB
+from .pyramid import minMaxPyramid, addPyramidToNWB
+from .ledger import sourceHash, conversionKey, lookupConversion, recordConversion
+from .instrument import instrumentation
+from .utils import seriesName, seriesPath
+
+# pyabf, pynwb and pandas are imported on first use, so importing this module (e.g. in a worker process) is cheap
+
+# # initialize dataframe for saving the tracking .csv file as you create NWB files
+# columns = ['cell_id', 'recording_date', 'exp_condition', 'cell_type', 'gain', 'dc', 'RMP',
+#        'firing rate', 'nwb_create_date', 'analysis_date']
+#
+# df = pd.DataFrame(columns=columns)
+# df.to_csv('/Volumes/PrajayShah_1TB/Work/White noise/ResponseVariabilityCells.csv', index=False)
+#
+excel_location = '/Volumes/PrajayShah_1TB/Work/White noise/ResponseVariabilityCells.csv'
+
+def writeNWBpatchClamp(file_path='', output_path='', experiment_condition='',
+                       date='', cell_number='', cell_type='', cell_id='', species='', gain=0.0, dc='not_given',
+                       offset=None, protocol='white noise', excel_location=excel_location, dtype=np.float32,
+                       stream=False, chunk_sweeps=8, storage=None, ledger=None, raw=False,
+                       features=False, spike_threshold=0.0, instrument=None, append=False, recording=None,
+                       pyramid=False):
+
+    '''
+    This function is designed to save the metadata and experimental data (.abf file) from a patch-clamp
+    experiment in the Valiante lab
+
+    :param file_path:       path to the .abf file to be saved as NWB
+    :param date:            date of the cell recording
+    :param cell_number:     cell number from that day for the patient or animal
+    :param cell_type:       description of cell (e.g. L2/3 Hu)
+    :param cell_id:         numerical ID of cell
+    :param species:         species
+    :param gain:            gain of the cell recording data
+    :param DC:              DC level at which cell was recorded at
+    :param offset:          resting membrane potential (RMP) offset between raw data and actual RMP value
+    :param excel_location:  tracking .csv file to append this cell to (None to skip the update); not updated when
+                            a ledger is given (see exportTrackingCSV)
+    :param dtype:           dtype of the sweep matrices written to the NWB file (np.float32 or np.float64), the same
+                            whether the recording is streamed or not
+    :param stream:          write the sweeps to the NWB file chunk by chunk instead of loading the whole recording
+                            into memory first (peak memory is then bounded by chunk_sweeps, not recording length);
+                            the datasets are then always chunked (chunks picked by h5py without a storage profile)
+    :param chunk_sweeps:    number of sweeps written at a time (and held in memory when stream=True)
+    :param storage:         HDF5 chunking/compression for ccs and ccss: a name from storage_profiles ('analysis',
+                            'archive', 'window'), a profile dict, or None for contiguous, uncompressed datasets (unless
+                            stream=True)
+    :param raw:             store the raw int16 ADC samples in ccs, with the ADC scaling recorded as the series
+                            conversion and the offset attribute of its data (about 4x smaller than float64); ccss is
+                            then stored as float32
+    :param features:        detect spikes and compute resting potential, firing rate and input-output gain of the
+                            recording; stored in a 'features' processing module and in the tracking row. The
+                            resting potential is measured where no current is injected, plus offset (see
+                            SpikeFeatures)
+    :param spike_threshold: spike detection threshold (mV) used when features=True
+    :param ledger:          SQLite conversion ledger; if it already records this exact .abf content converted with
+                            the same parameters (and the NWB file still exists) the conversion is skipped, otherwise
+                            it is recorded there instead of in the tracking .csv file
+    :param instrument:      Instrumentation (or the path of a JSON lines log) recording wall time, bytes read/written
+                            and peak memory of each stage: ledger, load, build, features, pyramid, write, record
+    :param append:          if the cell's NWB file (output_path/cell_id.nwb) already exists, add this recording to it
+                            as new ccss_<recording>/ccs_<recording> series (and features_<recording>,
+                            pyramid_<recording>) on the existing device and elec0, writing only the new data; the
+                            file metadata arguments are then ignored. A cell file that does not exist yet is
+                            created with plain ccss/ccs series
+    :param recording:       name of the recording within the cell file when appending (default: the .abf file name
+                            without extension, e.g. '18417018')
+    :param pyramid:         also store min/max envelope pyramids of ccs and ccss (minMaxPyramid) in a 'pyramid'
+                            processing module, for fast zoomed-out display with NWBEnvelope
+
+    :return: row            the row describing this cell in the tracking .csv file, with the recording name when
+                            append=True (None if skipped by the ledger)
+    '''
+
+    # ----------------------------------------------------------------------------------------------------------------------
+    # Load up the abf file into python
+    # ----------------------------------------------------------------------------------------------------------------------
+
+    import pyabf
+    from pynwb import NWBFile, NWBHDF5IO
+
+    fpath = file_path; f = cell_id
+
+    inst = instrumentation(instrument)
+
+    if ledger is not None:
+        inst.stage('ledger', file=cell_id)
+        params = conversionParams(file_path=fpath, output_path=output_path,
+                                  experiment_condition=experiment_condition, date=date, cell_number=cell_number,
+                                  cell_type=cell_type, cell_id=cell_id, species=species, gain=gain, dc=dc,
+                                  offset=offset, protocol=protocol, dtype=dtype, storage=storage, raw=raw,
+                                  features=features, spike_threshold=spike_threshold, append=append,
+                                  recording=recording, pyramid=pyramid)
+        source_sha256 = sourceHash(ledger, fpath)
+        key = conversionKey(source_sha256, params)
+        prior_row, prior_nwb = lookupConversion(ledger, key)
+        if prior_row is not None and os.path.exists(prior_nwb):
+            print('%s unchanged since %s, skipping' % (cell_id, prior_row.get('nwb_create_date')))
+            inst.done()
+            return None
+
+    # Load up abf file with pyABF
+    print('Loading %s ...' % cell_id)
+    inst.stage('load', file=cell_id)
+
+    V = {} # initialize voltage sweep databox
+    I = {} # initialize command databox
+
+    # raw mode: ccs keeps the int16 ADC samples, readers apply scaling = {conversion, offset} on access
+    # (pynwb 0.5 has no offset argument, so the offset is written to the data attributes after the file)
+    response_dtype = np.int16 if raw else dtype
+    command_dtype = np.float32 if raw else dtype
+    scaling = {}
+
+    if stream:
+        DataChunkIterator = _dataChunkIterator()
+        # sweeps are read from the .abf file only as NWBHDF5IO.write consumes them, chunk_sweeps at a time
+        a = pyabf.ABF(fpath, loadData=False)
+        shape = (a.sweepCount, a.sweepPointCount)
+        if raw:
+            scaling['conversion'], scaling['offset'] = abfScaling(a)
+        V[cell_id] = DataChunkIterator(data=iterABFsweeps(a, dtype=dtype, raw=raw), maxshape=shape,
+                                       dtype=np.dtype(response_dtype), buffer_size=chunk_sweeps)
+        I[cell_id] = DataChunkIterator(data=iterABFsweeps(a, dtype=command_dtype, command=True), maxshape=shape,
+                                       dtype=np.dtype(command_dtype), buffer_size=chunk_sweeps)
+    elif raw:
+        V[cell_id], scaling['conversion'], scaling['offset'], I[cell_id], a = loadABFraw(fpath)
+    else:
+        # numpy arrays of voltage recordings and command currents for all sweeps/segments - rows = sweeps, columns = data
+        V[cell_id], I[cell_id], a = loadABFpatchClamp(fpath, dtype=dtype)
+
+    if not stream:
+        inst.count(bytes_read=os.path.getsize(fpath))
+
+
+
+    # # Load up abf file - legacy nio importer (less functionality than pyABF and prone to breaking)
+    # from neo import io as nio   # note this code is validated for neo-0.5.2
+    # print('Loading %s ...' % cell_id)
+    # h = {}
+    # si = {}  # sampling intervals for each cell in us
+    # d = {}
+    # V = {}
+    # I = {}
+    #
+    # a = nio.AxonIO(filename=fpath)
+    # bl = a.read_block(lazy=False, signal_group_mode='split-all', units_group_mode='split-all')
+    # # - .segments represent sweeps (one segment = one sweep)
+    # # - .analogsignals for each segment: numpy array of voltage recordings and current input, length of recording block, and sampling rate
+    # iclamp = 0  # channel 4 as voltage channel
+    # current_in = 1  # channel 14 as command channel
+    # V[f] = []  # numpy array of voltage recordings for all sweeps/segments - rows = sweeps, columns = data
+    # for i in range(0, len(bl.segments)):
+    #     a = bl.segments[i].analogsignals[iclamp].__array__().tolist()
+    #     V[f].append([item for x in a for item in x])
+    # V[f] = np.array(V[f])
+    # I[f] = []  # numpy array of stimulus for all sweeps/segments - rows = sweeps, columns = data
+    # for i in range(0, len(bl.segments)):
+    #     a = bl.segments[i].analogsignals[current_in].__array__().tolist()
+    #     I[f].append([item for x in a for item in x])
+    # I[f] = np.array(I[f])
+    #
+    # # save data block for each cell
+    # d[f] = bl
+
+
+    # ----------------------------------------------------------------------------------------------------------------------
+    # Create the NWB file
+    # ----------------------------------------------------------------------------------------------------------------------
+
+    inst.stage('build')
+
+    nwb_path = output_path + '%s.nwb' % f
+    appending = append and os.path.exists(nwb_path)
+
+    if appending:
+        # pynwb 0.5 cannot add containers to a file it has read back, so the recording is written to a scratch
+        # file in a local temporary directory and its groups are copied into the cell file with h5py: only the new
+        # data is written to the (possibly slow, synced) output folder, once
+        recording_name = recording or os.path.splitext(os.path.basename(fpath))[0]
+        suffix = '_' + recording_name
+        bytes_before = os.path.getsize(nwb_path)
+        _checkAppend(nwb_path, recording_name)
+        scratch_dir = tempfile.mkdtemp(prefix='nwbpatchclamp-')
+        write_path = os.path.join(scratch_dir, os.path.basename(nwb_path))
+        nwbfile = NWBFile(session_description='recording %s of %s' % (recording_name, cell_id), source='',
+                          session_start_time=datetime.datetime.now(), identifier=cell_id)
+    else:
+        recording_name = None
+        suffix = ''
+        bytes_before = 0
+        write_path = nwb_path
+        nwbfile = NWBFile(session_description = ('Cell #'+ cell_number),
+                          session_start_time = date,
+                          source = '',
+                          identifier = cell_id,
+                          file_create_date = date,
+                          experiment_description=(species + ' ' + experiment_condition + ' ' + cell_type),
+                          experimenter='HM',
+                          lab='Valiante Laboratory',
+                          institution='Univ. of Toronto',
+                          protocol = protocol,
+                          notes = ('RMP Offset: ' + offset)
+                          )
+
+    # create a new device (when appending, the one of the cell file is used: see _copyRecording)
+    device = nwbfile.create_device(name='Clampfit', source='N/A')
+
+    # create a new electrode
+    elec = nwbfile.create_ic_electrode(
+        name="elec0", source='', slice='', resistance='', seal='', description='',
+        location='', filtering='', initial_access_resistance='', device=device)
+
+
+    ## Current clamp stimulus data
+    from pynwb.icephys import CurrentClampStimulusSeries
+
+    shape = (a.sweepCount, a.sweepPointCount)
+    command_data = _sweepData(I[f], shape, chunk_sweeps, storage)
+    response_data = _sweepData(V[f], shape, chunk_sweeps, storage)
+
+    ccss = CurrentClampStimulusSeries(
+        name=seriesName('ccss', recording_name), source="command", data=command_data, unit='pA', electrode = elec,
+        rate=10e4, gain=gain, starting_time=0.0, description='DC%s' % dc)
+
+    nwbfile.add_stimulus(ccss)
+
+    ## Current Clamp Response data
+    from pynwb.icephys import CurrentClampSeries
+
+    ccs = CurrentClampSeries(
+        name=seriesName('ccs', recording_name), source='command', data=response_data, electrode = elec,
+        unit='mV', rate=10e4,
+        gain=0.00, starting_time=0.0,
+        bias_current=np.nan, bridge_balance=np.nan, capacitance_compensation=np.nan, **_conversion(scaling))
+
+    nwbfile.add_acquisition(ccs)
+
+    ## Spike detection and firing features
+    if features:
+        inst.stage('features')
+        if stream:
+            # a separate bounded-memory pass, since the streamed sweeps are only read while the file is written
+            fx = sweepFeatures(iterABFsweeps(a, dtype=np.float32), iterABFsweeps(a, dtype=np.float32, command=True),
+                               rate=10e4, threshold=spike_threshold, chunk_sweeps=chunk_sweeps,
+                               rmp_offset=_rmpOffset(offset))
+        else:
+            fx = sweepFeatures(V[f], I[f], rate=10e4, threshold=spike_threshold, rmp_offset=_rmpOffset(offset),
+                               **scaling)
+        addFeaturesToNWB(nwbfile, fx, sweep_duration=a.sweepPointCount / 10e4, suffix=suffix)
+
+    ## Min/max envelope pyramids for display
+    if pyramid:
+        inst.stage('pyramid')
+        if stream:
+            # like features, a separate bounded-memory pass over the .abf file
+            responses = iterABFsweeps(a, dtype=dtype, raw=raw)
+            commands = iterABFsweeps(a, dtype=command_dtype, command=True)
+        else:
+            responses, commands = V[f], I[f]
+        ccs_levels = minMaxPyramid(responses, chunk_sweeps=chunk_sweeps)
+        addPyramidToNWB(nwbfile, {'ccs': (ccs_levels, 'mV', _conversion(scaling)),
+                                  'ccss': (minMaxPyramid(commands, chunk_sweeps=chunk_sweeps), 'pA', {})},
+                        rate=10e4, suffix=suffix)
+
+    # after adding all data,
+    # write data to NWBFile
+
+    inst.stage('write')
+    t0 = time.time()
+    try:
+        io = NWBHDF5IO(write_path, 'w')
+        io.write(nwbfile)
+        io.close()
+        if raw:
+            raw_paths = [seriesPath('ccs', recording_name) + '/data']
+            if pyramid:
+                raw_paths += ['processing/pyramid%s/ccs%s_L%d/data' % (suffix, suffix, k)
+                              for k in range(1, len(ccs_levels) + 1)]
+            _writeOffset(write_path, raw_paths, scaling['offset'])
+        if appending:
+            _copyRecording(write_path, nwb_path)
+    finally:
+        if appending:
+            shutil.rmtree(scratch_dir, ignore_errors=True)
+    inst.count(bytes_read=os.path.getsize(fpath) if stream else 0,
+               bytes_written=os.path.getsize(nwb_path) - bytes_before)
+    storageReport(nwb_path, time.time() - t0,
+                  series={seriesName(name, recording_name): seriesPath(name, recording_name) + '/data'
+                          for name in ('ccs', 'ccss')})
+
+    # ----------------------------------------------------------------------------------------------------------------------
+    # Update the .csv file containing a list of all the cells recorded
+    # ----------------------------------------------------------------------------------------------------------------------
+
+
+    row = {'cell_id': cell_id,
+           'cell #': ('Cell #%s' % cell_number),
+           'recording_date': date,
+           'exp_condition': experiment_condition,
+           'cell_type': cell_type,
+           'gain': gain,
+           'dc': dc,
+           'nwb_create_date': datetime.datetime.now().strftime("%I:%M%p %B %d, %Y")
+           }
+
+    if append:
+        row['recording'] = recording or os.path.splitext(os.path.basename(fpath))[0]
+
+    if features:
+        row.update({'RMP': fx['RMP'], 'firing rate': fx['firing rate'], 'io_gain': fx['io_gain']})
+
+    inst.stage('record')
+
+    if ledger is not None:
+        recordConversion(ledger, key, fpath, source_sha256, params, nwb_path, row)
+
+    # with a ledger the conversion is only recorded there; exportTrackingCSV writes the .csv file on demand
+    if excel_location is not None and ledger is None:
+        updateTrackingCSV(excel_location, [row])
+
+    inst.done()
+
+    print('%s' % cell_id, "Done!")
+    print('')
+
+    return row
+
+
+def conversionParams(file_path='', output_path='', experiment_condition='', date='', cell_number='', cell_type='',
+                     cell_id='', species='', gain=0.0, dc='not_given', offset=None, protocol='white noise',
+                     dtype=np.float32, storage=None, raw=False, features=False, spike_threshold=0.0,
+                     append=False, recording=None, pyramid=False, **ignored):
+
+    '''
+    The writeNWBpatchClamp arguments that, with the .abf content, identify a conversion in the ledger
+    (see conversionKey). Arguments that do not change the NWB file (stream, chunk_sweeps, instrument, ...) are
+    ignored, so a job dict of writeNWBpatchClamp keyword arguments can be passed as is.
+
+    :return: params dict
+    '''
+
+    params = {'output_path': output_path, 'experiment_condition': experiment_condition, 'date': date,
+              'cell_number': cell_number, 'cell_type': cell_type, 'cell_id': cell_id, 'species': species,
+              'gain': gain, 'dc': dc, 'offset': offset, 'protocol': protocol, 'dtype': np.dtype(dtype).name,
+              'storage': storage, 'raw': raw, 'features': features, 'spike_threshold': spike_threshold}
+    if append:
+        params['append'] = recording or os.path.splitext(os.path.basename(file_path))[0]
+    if pyramid:
+        params['pyramid'] = True
+    return params
+
+
+def updateTrackingCSV(excel_location, rows):
+
+    '''
+    Append rows describing converted cells to the tracking .csv file, rewriting it once for all of them.
+
+    :param excel_location:  path to the tracking .csv file
+    :param rows:            list of dicts as returned by writeNWBpatchClamp
+
+    :return:
+    '''
+
+    import pandas as pd
+
+    df = pd.read_csv(excel_location)
+    df_append = pd.concat([df, pd.DataFrame(rows)], ignore_index=True)
+    df_append.to_csv(excel_location, index=False)
+
+
+def _sweepData(data, shape, chunk_sweeps, storage):
+
+    # pynwb casts array data to the dtype of the NWB schema (float32 for icephys series), but writes a
+    # DataChunkIterator with the dtype of its sweeps: iterate over the in-memory matrices too, so they are stored
+    # with the same dtype as streamed sweeps, and (without a storage profile) still in a contiguous dataset
+    if isinstance(data, np.ndarray):
+        data = _dataChunkIterator()(data=data, maxshape=shape, dtype=data.dtype, buffer_size=chunk_sweeps)
+        if storage is None:
+            return contiguousData(data, shape)
+    return wrapStorage(data, shape, 10e4, storage)
+
+
+def _checkAppend(nwb_path, recording):
+
+    import h5py
+
+    with h5py.File(nwb_path, 'r') as h5:
+        if seriesPath('ccs', recording) in h5 or seriesPath('ccss', recording) in h5:
+            raise ValueError('%s already contains a recording named %s' % (nwb_path, recording))
+        if 'general/intracellular_ephys/elec0' not in h5:
+            raise ValueError('%s has no elec0 electrode to append recordings to' % nwb_path)
+
+
+def _copyRecording(scratch_path, nwb_path):
+
+    # copy the series and processing modules of an appended recording from its scratch file into the cell file;
+    # their electrode links are soft links to /general/intracellular_ephys/elec0, kept as such, so they resolve
+    # to the electrode (and device) already in the cell file
+    import h5py
+
+    with h5py.File(scratch_path, 'r') as src, h5py.File(nwb_path, 'r+') as dst:
+        for parent in ('acquisition', 'stimulus/presentation', 'processing'):
+            if parent not in src:
+                continue
+            group = dst.require_group(parent)
+            for name in src[parent]:
+                src.copy(src[parent][name], group, name=name, expand_soft=False)
+
+
+def _rmpOffset(offset):
+
+    # the offset argument is free text written to the notes ('RMP Offset: -15'); not a number means no correction
+    try:
+        return float(offset)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _conversion(scaling):
+
+    # the keyword arguments pynwb takes for the scaling of a raw series: conversion only (see _writeOffset)
+    return {'conversion': scaling['conversion']} if scaling else {}
+
+
+def _writeOffset(nwb_path, paths, offset):
+
+    # record the offset of raw series where NWB >= 2.1 keeps it, as the offset attribute of their data, since
+    # the TimeSeries of pynwb 0.5 do not take one; SweepArray, scaledData and NWBEnvelope read it from there
+    import h5py
+
+    with h5py.File(nwb_path, 'r+') as h5:
+        for path in paths:
+            h5[path].attrs['offset'] = offset
+
+
+def _dataChunkIterator():
+
+    try:
+        from hdmf.data_utils import DataChunkIterator
+    except ImportError:  # older pynwb releases bundle hdmf as pynwb.form
+        from pynwb.form.data_utils import DataChunkIterator
+    return DataChunkIterator
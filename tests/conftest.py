@@ -0,0 +1,55 @@
+import pytest
+
+
+def pytest_collection_modifyitems(config, items):
+
+    # writeNWBpatchClamp builds its files with the pynwb 0.5 API (source arguments, create_ic_electrode)
+    try:
+        import pynwb
+        reason = None if int(pynwb.__version__.split('.')[0]) < 1 else 'pynwb %s cannot run writeNWBpatchClamp' \
+                                                                     % pynwb.__version__
+    except Exception as e:  # not installed, or failing to import
+        reason = 'pynwb unavailable: %s' % e
+    if reason is not None:
+        for item in items:
+            if 'writer' in item.keywords:
+                item.add_marker(pytest.mark.skip(reason=reason))
+
+
+def pytest_configure(config):
+
+    config.addinivalue_line('markers', 'writer: test converts .abf files with writeNWBpatchClamp (needs pynwb 0.5)')
+
+
+@pytest.fixture(scope='session')
+def synthetic_abf(tmp_path_factory):
+
+    '''
+    (path, V, I) of a small synthetic white-noise .abf recording, written once per session.
+    '''
+
+    pytest.importorskip('pyabf')
+    from nwbpatchclamp import writeSyntheticABF
+
+    fpath = str(tmp_path_factory.mktemp('abf') / '18417018.abf')
+    V, I = writeSyntheticABF(fpath, n_sweeps=6, sweep_duration=0.25, rate=10e4)
+    return fpath, V, I
+
+
+@pytest.fixture
+def convert(synthetic_abf, tmp_path):
+
+    '''
+    convert(**options) writes the synthetic recording to <tmp_path>/<cell_id>.nwb and returns that path.
+    '''
+
+    from nwbpatchclamp import writeNWBpatchClamp
+
+    def convert(file_path=synthetic_abf[0], output_path=None, cell_id='cell', **options):
+        output_path = str(tmp_path) + '/' if output_path is None else output_path
+        options = dict({'date': 'Apr 17, 2018', 'cell_number': '1', 'offset': '0', 'excel_location': None}, **options)
+        writeNWBpatchClamp(file_path=file_path, output_path=output_path, cell_id=cell_id, **options)
+        return output_path + cell_id + '.nwb'
+
+    return convert
+
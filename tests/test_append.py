@@ -0,0 +1,115 @@
+import csv
+import os
+import tempfile
+
+import numpy as np
+import pytest
+
+pytestmark = pytest.mark.writer
+
+
+@pytest.fixture
+def second_abf(tmp_path):
+
+    # another recording of the same cell: a different seed and length
+    from nwbpatchclamp import writeSyntheticABF
+
+    fpath = str(tmp_path / '18417019.abf')
+    writeSyntheticABF(fpath, n_sweeps=4, sweep_duration=0.2, rate=10e4, seed=1)
+    return fpath
+
+
+@pytest.mark.parametrize('options', [{}, {'raw': True, 'pyramid': True, 'features': True}])
+def test_append_two_recordings_and_read_them_back(synthetic_abf, second_abf, convert, options):
+
+    from nwbpatchclamp import loadABFpatchClamp, readNWBpatchClamp, NWBpatchClampReader, NWBEnvelope
+
+    nwb_path = convert(append=True, **options)                                    # creates the cell file
+    size = os.path.getsize(nwb_path)
+    convert(append=True, recording='second', file_path=second_abf, **options)
+    convert(append=True, file_path=synthetic_abf[0], recording='again', **options)
+    assert os.path.getsize(nwb_path) > size
+
+    V1, _, _ = loadABFpatchClamp(synthetic_abf[0], dtype=np.float32)
+    V2, _, _ = loadABFpatchClamp(second_abf, dtype=np.float32)
+
+    with NWBpatchClampReader(nwb_path) as nwb:
+        assert nwb.recordings == [None, 'again', 'second']
+        assert np.array_equal(nwb.current_clamp[()], V1)
+    for recording, V in (('second', V2), ('again', V1)):
+        with NWBpatchClampReader(nwb_path, recording=recording) as nwb:
+            assert nwb.ccs.name == 'ccs_' + recording and nwb.ccs.electrode.name == 'elec0'
+            assert np.array_equal(nwb.current_clamp[()], V)
+            assert nwb.current_stimulus.shape == V.shape
+        nwbfile, ccss, ccs, current_stimulus, current_clamp = readNWBpatchClamp(nwb_path, recording=recording)
+        assert np.array_equal(current_clamp, V)
+        assert len(nwbfile.devices) == 1 and len(nwbfile.ic_electrodes) == 1
+        if options.get('pyramid'):
+            with NWBEnvelope(nwb_path, recording=recording) as env:
+                t, lo, hi = env.window(sweep=1, pixels=10)
+            assert lo.min() == V[1].min() and hi.max() == V[1].max()
+        if options.get('features'):
+            assert 'features_' + recording in nwbfile.modules
+
+
+def test_append_refuses_a_recording_name_twice(convert, second_abf, tmp_path):
+
+    nwb_path = convert(append=True)
+    convert(append=True, file_path=second_abf)
+    size = os.path.getsize(nwb_path)
+    with pytest.raises(ValueError, match='18417019'):
+        convert(append=True, file_path=second_abf)
+    assert os.path.getsize(nwb_path) == size
+    assert not [name for name in os.listdir(str(tmp_path)) if name.endswith('.tmp')]
+
+
+def test_index_covers_appended_recordings(convert, second_abf, tmp_path):
+
+    import sqlite3
+
+    from nwbpatchclamp import indexNWBpatchClamp, queryIndex
+
+    (tmp_path / 'nwb').mkdir()
+    output_path = str(tmp_path / 'nwb') + '/'
+    convert(output_path=output_path, append=True, gain=20.0, dc='50')
+    convert(output_path=output_path, append=True, file_path=second_abf, gain=40.0, dc='75')
+
+    # an index written before recordings were indexed is rebuilt
+    index_path = str(tmp_path / 'index.sqlite')
+    with sqlite3.connect(index_path) as con:
+        con.execute('CREATE TABLE files (path, mtime_ns, size)')
+        con.execute('CREATE TABLE sweeps (path, sweep, v_mean)')
+    indexNWBpatchClamp(output_path, index_path)
+
+    files = queryIndex(index_path)
+    recordings = queryIndex(index_path, 'SELECT * FROM recordings ORDER BY recording')
+    sweeps = queryIndex(index_path, 'SELECT recording, COUNT(*) AS n FROM sweeps GROUP BY recording ORDER BY recording')
+
+    assert len(files) == 1 and files['dc'][0] == '50' and files['gain'][0] == 20.0
+    assert list(recordings['recording']) == ['', '18417019']
+    assert list(recordings['dc']) == ['50', '75'] and list(recordings['gain']) == [20.0, 40.0]
+    assert list(sweeps['n']) == list(recordings['n_sweeps']) == [6, 4]
+
+
+def test_append_writes_only_the_cell_file_and_exports_every_recording(convert, second_abf, tmp_path, monkeypatch):
+
+    from nwbpatchclamp import exportTrackingCSV
+
+    out = tmp_path / 'out'
+    out.mkdir()
+    scratch = tmp_path / 'scratch'
+    scratch.mkdir()
+    monkeypatch.setattr(tempfile, 'tempdir', str(scratch))
+    ledger = str(tmp_path / 'ledger.sqlite')
+
+    convert(output_path=str(out) + '/', append=True, ledger=ledger)
+    convert(output_path=str(out) + '/', append=True, file_path=second_abf, ledger=ledger)
+    convert(output_path=str(out) + '/', append=True, file_path=second_abf, ledger=ledger)  # unchanged: skipped
+
+    assert os.listdir(str(out)) == ['cell.nwb'] and os.listdir(str(scratch)) == []
+
+    csv_path = str(tmp_path / 'cells.csv')
+    assert exportTrackingCSV(ledger, csv_path) == 2
+    with open(csv_path) as f:
+        assert [(r['cell_id'], r['recording']) for r in csv.DictReader(f)] == [('cell', '18417018'),
+                                                                              ('cell', '18417019')]
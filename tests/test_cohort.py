@@ -0,0 +1,103 @@
+import h5py
+import numpy as np
+import pytest
+
+pytestmark = pytest.mark.writer
+
+
+@pytest.fixture
+def cohort_files(synthetic_abf, convert, tmp_path):
+
+    '''
+    {cell_id: (nwb path, V, I)} of two cells, one stored as float32 and one as raw int16; their ccss series hold the
+    synthetic command (ABF files written by pyabf carry none), and V is the membrane potential as stored.
+    '''
+
+    from nwbpatchclamp import writeSyntheticABF, loadABFpatchClamp
+
+    second = str(tmp_path / '18417019.abf')
+    _, I_second = writeSyntheticABF(second, n_sweeps=4, sweep_duration=0.25, rate=10e4, seed=1)
+
+    cells = {}
+    for cell_id, abf, I, options in (('a', synthetic_abf[0], synthetic_abf[2], {}),
+                                     ('b', second, I_second, {'raw': True})):
+        nwb_path = convert(file_path=abf, cell_id=cell_id, **options)
+        with h5py.File(nwb_path, 'r+') as h5:
+            h5['stimulus/presentation/ccss/data'][...] = I
+            I = h5['stimulus/presentation/ccss/data'][()].astype(np.float64)
+        V, _, _ = loadABFpatchClamp(abf, dtype=np.float32)
+        cells[cell_id] = (nwb_path, V.astype(np.float64), I)
+    return cells
+
+
+def cohort(cohort_files, **kwargs):
+
+    from nwbpatchclamp import NWBCohort
+
+    return NWBCohort([path for path, V, I in cohort_files.values()], **dict({'chunk_sweeps': 2, 'workers': 1},
+                                                                            **kwargs))
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_moments_match_numpy(cohort_files, workers):
+
+    v = cohort(cohort_files, workers=workers).sel(sweeps=slice(1, 5), start=0.05, stop=0.2)
+    X = {cell_id: V[1:5, 5000:20000] for cell_id, (path, V, I) in cohort_files.items()}
+    pooled = np.vstack(list(X.values()))
+
+    assert v.shapes == {'a': (4, 15000), 'b': (3, 15000)}
+    for dim, axis in (('sweep', 0), ('time', 1), (None, None)):
+        mean, var = v.mean(dim=dim), v.var(dim=dim, ddof=1)
+        for cell_id in X:
+            assert np.allclose(mean[cell_id], X[cell_id].mean(axis=axis)), (dim, cell_id)
+            assert np.allclose(var[cell_id], X[cell_id].var(axis=axis, ddof=1)), (dim, cell_id)
+        if dim != 'time':
+            assert np.allclose(v.mean(dim=dim, pooled=True), pooled.mean(axis=axis)), dim
+            assert np.allclose(v.var(dim=dim, pooled=True), pooled.var(axis=axis)), dim
+
+
+def test_sta_matches_numpy(cohort_files):
+
+    lag0, lag1, threshold, min_interval = -1000, 0, 0.0, 200
+    windows = {}
+    for cell_id, (path, V, I) in cohort_files.items():
+        windows[cell_id] = []
+        for sweep in range(1, len(V)):
+            crossings = [t for t in range(1, V.shape[1]) if V[sweep, t - 1] < threshold <= V[sweep, t]]
+            for k, t in enumerate(crossings):
+                if (k and t - crossings[k - 1] < min_interval) or t + lag0 < 0 or not 0.02 * 10e4 <= t:
+                    continue
+                windows[cell_id].append(I[sweep, t + lag0:t + lag1])
+
+    lags, sta, n_spikes = cohort(cohort_files).sel(sweeps=slice(1, None), start=0.02).sta(window=(-0.01, 0.0))
+    assert np.allclose(lags, np.arange(lag0, lag1) / 10e4)
+    for cell_id, w in windows.items():
+        assert len(w) and n_spikes[cell_id] == len(w)
+        assert np.allclose(sta[cell_id], np.mean(w, axis=0)), cell_id
+
+    _, sta, n = cohort(cohort_files).sel(sweeps=slice(1, None), start=0.02).sta(window=(-0.01, 0.0), pooled=True)
+    assert n == sum(len(w) for w in windows.values())
+    assert np.allclose(sta, np.mean(windows['a'] + windows['b'], axis=0))
+
+
+def test_empty_selection(cohort_files):
+
+    v = cohort(cohort_files).sel(sweeps=slice(100, 200))
+    with pytest.raises(ValueError, match='selection is empty'):
+        v.mean(pooled=True)
+    with pytest.raises(ValueError, match='selection is empty'):
+        v.var(dim=None, pooled=True)
+
+    mean, var = v.mean(), v.var(dim=None)
+    assert all(np.all(np.isnan(m)) and m.shape == (25000,) for m in mean.values())
+    assert all(np.isnan(x) for x in var.values())
+    assert all(len(m) == 0 for m in v.mean(dim='time').values())
+
+    # cells without selected sweeps are NaN, the others are reduced as usual
+    v = cohort(cohort_files).sel(sweeps=slice(4, 6))
+    V = cohort_files['a'][1]
+    assert np.allclose(v.mean(pooled=True), V[4:6].mean(axis=0))
+    assert np.all(np.isnan(v.mean()['b']))
+
+    lags, sta, n_spikes = v.sta(window=(-0.01, 0.0))
+    assert n_spikes['b'] == 0 and np.all(np.isnan(sta['b'])) and len(sta['b']) == len(lags)
@@ -0,0 +1,46 @@
+import importlib
+import os
+import pkgutil
+import subprocess
+import sys
+import types
+
+import nwbpatchclamp
+
+
+def test_import_is_lazy():
+
+    # a fresh interpreter: importing the package imports none of its submodules or heavy dependencies
+    code = ('import sys, nwbpatchclamp; '
+            'print(sorted(m for m in sys.modules if m.startswith("nwbpatchclamp.") '
+            'or m.split(".")[0] in ("pyabf", "pynwb", "pandas", "h5py")))')
+    out = subprocess.check_output([sys.executable, '-c', code],
+                                  cwd=os.path.dirname(os.path.dirname(nwbpatchclamp.__file__)))
+    assert out.decode().strip() == '[]'
+
+
+def test_every_export_resolves():
+
+    for name, module in nwbpatchclamp._exports.items():
+        assert getattr(nwbpatchclamp, name) is getattr(importlib.import_module('nwbpatchclamp.' + module), name)
+
+
+def test_no_export_is_named_like_a_submodule():
+
+    submodules = {info.name for info in pkgutil.iter_modules(nwbpatchclamp.__path__)}
+    assert not submodules & set(nwbpatchclamp._exports)
+
+
+def test_exports_survive_submodule_imports():
+
+    # importing every submodule (as the pipeline and the batch converter do) leaves the functions in place
+    for info in pkgutil.iter_modules(nwbpatchclamp.__path__):
+        if info.name != '__main__':
+            importlib.import_module('nwbpatchclamp.' + info.name)
+
+    for name in ('loadABFpatchClamp', 'writeNWBpatchClamp', 'readNWBpatchClamp', 'indexNWBpatchClamp',
+                 'batchNWBpatchClamp', 'pipelineNWBpatchClamp', 'syntheticPatchClamp'):
+        assert isinstance(getattr(nwbpatchclamp, name), types.FunctionType), name
+
+    from nwbpatchclamp import writeNWBpatchClamp
+    assert isinstance(writeNWBpatchClamp, types.FunctionType)
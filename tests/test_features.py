@@ -0,0 +1,40 @@
+import numpy as np
+
+from nwbpatchclamp import SpikeFeatures, sweepFeatures
+
+
+def test_rmp_is_measured_without_injected_current():
+
+    rate = 10e3
+    V = np.full((3, 1000), -40.0)
+    I = np.full((3, 1000), 200.0)
+    V[:, :100], I[:, :100] = -70.0, 0.0        # holding period: no current, at rest
+    V[:, 500:510] = 20.0                       # one spike per sweep, while current is injected
+    I[2] = 150.0                               # current injected throughout: no resting potential
+
+    fx = sweepFeatures(V, I, rate=rate, threshold=0.0, chunk_sweeps=2, rmp_offset=-15.0)
+
+    assert np.array_equal(fx['rmp'][:2], [-85.0, -85.0]) and np.isnan(fx['rmp'][2])
+    assert fx['RMP'] == -85.0
+    assert np.array_equal(fx['n_spikes'], [1, 1, 1])
+    assert np.allclose(fx['spike_times'], 500 / rate)
+
+
+def test_unknown_command_gives_no_rmp():
+
+    features = SpikeFeatures(rate=10e3)
+    features.addSweeps(np.full((2, 100), -65.0), np.full((2, 100), np.nan))
+    fx = features.result()
+    assert np.all(np.isnan(fx['rmp'])) and np.isnan(fx['RMP']) and np.isnan(fx['io_gain'])
+
+
+def test_chunks_match_one_pass():
+
+    rng = np.random.default_rng(1)
+    V = -60 + 30 * rng.standard_normal((7, 500))
+    I = np.where(np.arange(500) < 50, 0.0, 100 + rng.standard_normal((7, 500)))
+
+    whole = sweepFeatures(V, I, rate=10e3, chunk_sweeps=7)
+    chunked = sweepFeatures(iter(V), iter(I), rate=10e3, chunk_sweeps=3)
+    for key in ('rmp', 'n_spikes', 'spike_sweeps', 'spike_times', 'mean_current'):
+        assert np.array_equal(whole[key], chunked[key]), key
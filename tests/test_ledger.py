@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+pytestmark = pytest.mark.writer
+
+
+def test_unchanged_recording_is_skipped(convert, tmp_path, capsys):
+
+    ledger = str(tmp_path / 'ledger.sqlite')
+    nwb_path = convert(ledger=ledger, gain=20.0)
+    mtime = os.stat(nwb_path).st_mtime_ns
+
+    # same content and parameters: skipped, file untouched
+    convert(ledger=ledger, gain=20.0)
+    assert 'unchanged since' in capsys.readouterr().out
+    assert os.stat(nwb_path).st_mtime_ns == mtime
+
+    # other parameters, or the NWB file gone: converted again
+    convert(ledger=ledger, gain=40.0)
+    assert 'unchanged since' not in capsys.readouterr().out
+    os.remove(nwb_path)
+    convert(ledger=ledger, gain=40.0)
+    assert 'unchanged since' not in capsys.readouterr().out and os.path.exists(nwb_path)
+
+
+def test_batch_skips_recorded_conversions(synthetic_abf, tmp_path):
+
+    from nwbpatchclamp import batchNWBpatchClamp, exportTrackingCSV
+
+    manifest = tmp_path / 'manifest.csv'
+    manifest.write_text('file_path,output_path,cell_id,date,cell_number,offset,gain\n'
+                        '%s,%s/,cell,"Apr 17, 2018",1,0,20\n' % (synthetic_abf[0], tmp_path))
+    ledger = str(tmp_path / 'ledger.sqlite')
+
+    first = batchNWBpatchClamp(str(manifest), workers=1, excel_location=None, ledger=ledger)
+    second = batchNWBpatchClamp(str(manifest), workers=1, excel_location=None, ledger=ledger)
+
+    assert first[0]['error'] is None and first[0]['row']['cell_id'] == 'cell'
+    assert second[0]['error'] is None and second[0]['row'] is None
+    assert exportTrackingCSV(ledger, str(tmp_path / 'cells.csv')) == 1
+
+
+def test_ledger_replaces_the_tracking_csv(convert, tmp_path):
+
+    from nwbpatchclamp import exportTrackingCSV
+
+    tracking = tmp_path / 'cells.csv'
+    tracking.write_text('cell_id,recording_date\n')
+    ledger = str(tmp_path / 'ledger.sqlite')
+
+    convert(ledger=ledger, excel_location=str(tracking))
+    assert tracking.read_text() == 'cell_id,recording_date\n'
+
+    assert exportTrackingCSV(ledger, str(tracking)) == 1
+    assert tracking.read_text().splitlines()[1].startswith('cell,')
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+pyabf = pytest.importorskip('pyabf')
+
+from nwbpatchclamp import loadABFpatchClamp, loadABFraw, iterABFsweeps, abfScaling  # noqa: E402
+
+
+def sweepBySweep(fpath):
+
+    # the reference: pyabf's own per-sweep accessors
+    a = pyabf.ABF(fpath)
+    V, I = [], []
+    for i in range(a.sweepCount):
+        a.setSweep(i)
+        V.append(a.sweepY.copy())
+        I.append(a.sweepC.copy())
+    return np.array(V), np.array(I)
+
+
+@pytest.mark.parametrize('dtype', [np.float32, np.float64])
+def test_vectorized_load_matches_pyabf(synthetic_abf, dtype):
+
+    V_ref, I_ref = sweepBySweep(synthetic_abf[0])
+    V, I, a = loadABFpatchClamp(synthetic_abf[0], dtype=dtype)
+
+    assert V.dtype == I.dtype == dtype and V.shape == (a.sweepCount, a.sweepPointCount)
+    assert np.array_equal(V, V_ref.astype(dtype))
+    assert np.array_equal(I, I_ref.astype(dtype), equal_nan=True)
+
+
+def test_iterated_sweeps_match_the_load(synthetic_abf):
+
+    V, I, _ = loadABFpatchClamp(synthetic_abf[0], dtype=np.float32)
+
+    assert np.array_equal(np.array(list(iterABFsweeps(synthetic_abf[0], dtype=np.float32))), V)
+    assert np.array_equal(np.array(list(iterABFsweeps(synthetic_abf[0], dtype=np.float32, command=True))), I,
+                          equal_nan=True)
+
+
+def test_raw_samples_scale_to_the_load(synthetic_abf):
+
+    V, _, _ = loadABFpatchClamp(synthetic_abf[0], dtype=np.float32)
+    raw, conversion, offset, _, a = loadABFraw(synthetic_abf[0])
+
+    assert raw.dtype == np.int16 and (conversion, offset) == abfScaling(a)
+    assert np.array_equal(np.float32(raw * np.float32(conversion)) + np.float32(offset), V)
+    assert np.array_equal(np.array(list(iterABFsweeps(synthetic_abf[0], raw=True))), raw)
+
+
+def test_synthetic_abf_stores_the_membrane_potential_only(synthetic_abf):
+
+    fpath, V_generated, I_generated = synthetic_abf
+    V, I, _ = loadABFpatchClamp(fpath)
+
+    # int16 quantization of the written potential; the command is not in the file
+    assert np.abs(V - V_generated).max() < 1e-2
+    assert np.all(np.isnan(I))
+    assert np.all(I_generated[:, :int(I_generated.shape[1] / 64)] == 0)
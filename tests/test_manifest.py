@@ -0,0 +1,36 @@
+from nwbpatchclamp import readManifest
+
+
+def writeManifest(tmp_path, header, *rows):
+
+    path = tmp_path / 'manifest.csv'
+    path.write_text('\n'.join([header] + list(rows)) + '\n')
+    return str(path)
+
+
+def test_csv_values_are_coerced(tmp_path):
+
+    path = writeManifest(tmp_path, 'file_path,cell_id,date,gain,dc,offset,stream,raw,chunk_sweeps,note',
+                         'a.abf,18417018,"Apr 17, 2018",20.,75,-5.2,true,False,16,kept out',
+                         'b.abf,18417019,"Apr 17, 2018",40,,,0,1,,')
+    a, b = readManifest(path)
+
+    assert a == {'file_path': 'a.abf', 'cell_id': '18417018', 'date': 'Apr 17, 2018', 'gain': 20.0, 'dc': '75',
+                 'offset': '-5.2', 'stream': True, 'raw': False, 'chunk_sweeps': 16}
+    assert b == {'file_path': 'b.abf', 'cell_id': '18417019', 'date': 'Apr 17, 2018', 'gain': 40.0,
+                 'stream': False, 'raw': True}
+
+
+def test_raw_false_is_not_truthy(tmp_path):
+
+    # a non-empty string such as 'False' would otherwise switch raw storage on
+    job, = readManifest(writeManifest(tmp_path, 'file_path,raw', 'a.abf,False'))
+    assert job['raw'] is False
+
+
+def test_feature_columns_are_coerced(tmp_path):
+
+    a, b = readManifest(writeManifest(tmp_path, 'file_path,features,spike_threshold',
+                                      'a.abf,yes,-20', 'b.abf,false,'))
+    assert a == {'file_path': 'a.abf', 'features': True, 'spike_threshold': -20.0}
+    assert b == {'file_path': 'b.abf', 'features': False}
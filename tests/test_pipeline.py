@@ -0,0 +1,50 @@
+import hashlib
+import importlib
+
+import pytest
+
+pytestmark = pytest.mark.writer
+
+
+def test_ledger_miss_reads_the_source_once(synthetic_abf, tmp_path, monkeypatch):
+
+    from nwbpatchclamp import pipelineNWBpatchClamp
+    from nwbpatchclamp.ledger import cachedSourceHash
+
+    pipeline = importlib.import_module('nwbpatchclamp.pipeline')
+    abf_path = synthetic_abf[0]
+    manifest = tmp_path / 'manifest.csv'
+    manifest.write_text('file_path,output_path,cell_id,date,cell_number,offset\n'
+                        '%s,%s/,cell,"Apr 17, 2018",1,0\n' % (abf_path, tmp_path))
+    ledger = str(tmp_path / 'ledger.sqlite')
+
+    # count the reads of the source made by the read stage (hashing and staging)
+    reads = []
+    real_open, real_copyfile = open, pipeline.shutil.copyfile
+
+    def countingOpen(path, mode='r', *args, **kwargs):
+        if path == abf_path:
+            reads.append('open')
+        return real_open(path, mode, *args, **kwargs)
+
+    def countingCopyfile(src, dst, *args, **kwargs):
+        if src == abf_path:
+            reads.append('copyfile')
+        return real_copyfile(src, dst, *args, **kwargs)
+
+    monkeypatch.setattr(pipeline, 'open', countingOpen, raising=False)
+    monkeypatch.setattr(pipeline.shutil, 'copyfile', countingCopyfile)
+    monkeypatch.setattr(pipeline, 'sourceHash', None, raising=False)  # must not be used: it reads the file again
+
+    results, _ = pipelineNWBpatchClamp(str(manifest), excel_location=None, ledger=ledger)
+    assert results[0]['error'] is None and results[0]['row'] is not None
+    assert len(reads) == 1
+
+    with open(abf_path, 'rb') as f:
+        assert cachedSourceHash(ledger, abf_path) == hashlib.sha256(f.read()).hexdigest()
+
+    # unchanged: skipped from the cached hash, without reading the source
+    reads.clear()
+    results, _ = pipelineNWBpatchClamp(str(manifest), excel_location=None, ledger=ledger)
+    assert results[0]['error'] is None and results[0]['row'] is None
+    assert reads == []
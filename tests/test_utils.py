@@ -0,0 +1,19 @@
+from nwbpatchclamp import seriesName, seriesPath, timeToIndex
+
+
+def test_time_to_index():
+
+    # the first point at or after t, robust to the rounding of sample times, clipped to the sweep
+    assert timeToIndex(0.5, 0.0, 10e4, 100000) == 50000
+    assert timeToIndex(0.1 + 0.2, 0.0, 10e4, 100000) == 30000
+    assert timeToIndex(0.500005, 0.0, 10e4, 100000) == 50001
+    assert timeToIndex(1.0, 0.5, 10e4, 100000) == 50000
+    assert timeToIndex(-1.0, 0.0, 10e4, 100000) == 0
+    assert timeToIndex(5.0, 0.0, 10e4, 100000) == 100000
+
+
+def test_series_names_and_paths():
+
+    assert seriesName('ccs', None) == 'ccs' and seriesName('ccss', '18417019') == 'ccss_18417019'
+    assert seriesPath('ccs') == 'acquisition/ccs'
+    assert seriesPath('ccss', '18417019') == 'stimulus/presentation/ccss_18417019'
@@ -0,0 +1,80 @@
+import importlib
+
+import h5py
+import numpy as np
+import pytest
+
+pytestmark = pytest.mark.writer
+
+
+def series(nwb_path, path):
+
+    with h5py.File(nwb_path, 'r') as h5:
+        return h5[path][()]
+
+
+@pytest.mark.parametrize('dtype', [np.float32, np.float64])
+@pytest.mark.parametrize('storage', [None, 'archive'])
+def test_stream_matches_in_memory(convert, tmp_path, dtype, storage):
+
+    (tmp_path / 'memory').mkdir()
+    (tmp_path / 'stream').mkdir()
+    in_memory = convert(output_path=str(tmp_path / 'memory') + '/', dtype=dtype, storage=storage)
+    streamed = convert(output_path=str(tmp_path / 'stream') + '/', dtype=dtype, storage=storage, stream=True,
+                       chunk_sweeps=4)
+
+    for path in ('acquisition/ccs/data', 'stimulus/presentation/ccss/data'):
+        a, b = series(in_memory, path), series(streamed, path)
+        assert a.dtype == b.dtype == dtype, path
+        assert np.array_equal(a, b, equal_nan=True), path
+
+
+@pytest.mark.parametrize('raw', [False, True])
+def test_in_memory_data_is_contiguous(convert, tmp_path, raw):
+
+    nwb_path = convert(raw=raw, dtype=np.float64)
+    with h5py.File(nwb_path, 'r') as h5:
+        for path in ('acquisition/ccs/data', 'stimulus/presentation/ccss/data'):
+            assert h5[path].chunks is None and h5[path].maxshape == h5[path].shape, path
+        assert h5['acquisition/ccs/data'].dtype == (np.int16 if raw else np.float64)
+
+    (tmp_path / 'stream').mkdir()
+    with h5py.File(convert(output_path=str(tmp_path / 'stream') + '/', stream=True), 'r') as h5:
+        assert h5['acquisition/ccs/data'].chunks is not None
+
+
+def test_values_match_the_abf(synthetic_abf, convert):
+
+    from nwbpatchclamp import loadABFpatchClamp
+
+    V, I, _ = loadABFpatchClamp(synthetic_abf[0], dtype=np.float32)
+    assert np.array_equal(series(convert(), 'acquisition/ccs/data'), V)
+
+
+@pytest.mark.parametrize('pyramid', [False, True])
+def test_raw_keeps_int16_with_conversion_and_offset(synthetic_abf, convert, monkeypatch, pyramid):
+
+    writer = importlib.import_module('nwbpatchclamp.write')
+    from nwbpatchclamp import loadABFpatchClamp, loadABFraw, NWBpatchClampReader, NWBEnvelope
+
+    # pyabf writes ABF files without an ADC offset: shift the scaling so the offset is exercised
+    def shiftedABFraw(fpath, *args, **kwargs):
+        V, conversion, offset, I, a = loadABFraw(fpath, *args, **kwargs)
+        return V, conversion, offset + 2.5, I, a
+
+    monkeypatch.setattr(writer, 'loadABFraw', shiftedABFraw)
+    nwb_path = convert(raw=True, pyramid=pyramid)
+
+    with h5py.File(nwb_path, 'r') as h5:
+        data = h5['acquisition/ccs/data']
+        assert data.dtype == np.int16 and data.attrs['offset'] == 2.5
+    V, _, _ = loadABFpatchClamp(synthetic_abf[0], dtype=np.float32)
+    expected = V + np.float32(2.5)
+    with NWBpatchClampReader(nwb_path) as nwb:
+        assert nwb.current_clamp.dtype == np.float32
+        assert np.array_equal(nwb.current_clamp[()], expected)
+
+    if pyramid:
+        with NWBEnvelope(nwb_path) as env:
+            t, lo, hi = env.window(sweep=1, pixels=10)
+        assert lo.min() == expected[1].min() and hi.max() == expected[1].max()